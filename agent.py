@@ -1,140 +1,843 @@
-from typing import Callable, List, Dict, Any
-
-import dotenv
-
-import anthropic
-from anthropic.types.message import Message
-
-from tools.read_file import READ_FILE_DEFINITION
-from tools.list_directory import LIST_DIRECTORY_DEFINITION
-from tools.edit_file import EDIT_FILE_DEFINITION
-from tools.create_file import CREATE_FILE_DEFINITION
-from tools.delete_file import DELETE_FILE_DEFINITION
-from tools.move_file import MOVE_FILE_DEFINITION
-from tools.search_files import SEARCH_FILES_DEFINITION
-from tools.get_file_info import GET_FILE_INFO_DEFINITION
-from tools.create_directory import CREATE_DIRECTORY_DEFINITION
-from tools.delete_directory import DELETE_DIRECTORY_DEFINITION
-from tools.move_directory import MOVE_DIRECTORY_DEFINITION
-from tools.copy_directory import COPY_DIRECTORY_DEFINITION
-from tools.clean_directory import CLEAN_DIRECTORY_DEFINITION
-from tools.run_script import RUN_SCRIPT_DEFINITION
-from tools.run_tests import RUN_TESTS_DEFINITION
-from tools.lint_code import LINT_CODE_DEFINITION
-from tools.install_package import INSTALL_PACKAGE_DEFINITION
-
-dotenv.load_dotenv()
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+import importlib
+import importlib.util
+import inspect
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Dict, Any, Optional, Union
+
+if TYPE_CHECKING:
+    # anthropic and the tool modules are imported lazily to keep startup fast
+    import anthropic
+    from anthropic.types.message import Message
 
 class ToolDefinition:
-    def __init__(self, name: str, description: str, input_schema: Dict[str, Any], tool_function: Callable = None):
+    def __init__(self, name: str, description: str, input_schema: Dict[str, Any], tool_function: Callable = None,
+                 read_only: bool = False, path_arguments: Optional[List[str]] = None,
+                 async_tool_function: Optional[Callable] = None):
         self.name: str = name
         self.description: str = description
         self.input_schema: Dict[str, Any] = input_schema
         self.tool_function: Callable = tool_function
+        # Optional coroutine version of tool_function, used by AsyncAgent
+        self.async_tool_function: Optional[Callable] = async_tool_function
+        # read_only tools may run alongside each other; path_arguments names the
+        # inputs holding the paths a tool touches (None means the whole tree).
+        self.read_only: bool = read_only
+        self.path_arguments: Optional[List[str]] = path_arguments
+
+    def touched_paths(self, tool_input: Dict[str, Any]) -> Optional[List[str]]:
+        """Return the absolute paths a call touches, or None if it may touch anything."""
+        if self.path_arguments is None:
+            return None
+        properties = self.input_schema.get("properties", {})
+        paths = []
+        for key in self.path_arguments:
+            value = tool_input.get(key, properties.get(key, {}).get("default"))
+            # List arguments hold paths or objects with a "path" (e.g. a batch of edits)
+            for item in value if isinstance(value, list) else [value]:
+                paths.append(item.get("path") if isinstance(item, dict) else item)
+        return [os.path.abspath(_glob_root(path)) for path in paths if isinstance(path, str) and path]
+
+def _glob_root(path: str) -> str:
+    """The directory a glob pattern can only match beneath (the path itself if it isn't a pattern)."""
+    parts = path.replace(os.sep, "/").split("/")
+    for index, part in enumerate(parts):
+        if any(char in part for char in "*?["):
+            return "/".join(parts[:index]) or ("/" if path.startswith("/") else ".")
+    return path
+
+class LazyToolDefinition(ToolDefinition):
+    """A ToolDefinition whose implementing module is only imported the first time the tool is called."""
+
+    def __init__(self, module: str, definition: str, name: str, description: str, input_schema: Dict[str, Any],
+                 read_only: bool = False, path_arguments: Optional[List[str]] = None):
+        self.module: str = module
+        self.definition: str = definition
+        self._loaded: Optional[Dict[str, Any]] = None
+        super().__init__(name, description, input_schema, None, read_only, path_arguments)
+
+    def _load(self) -> Dict[str, Any]:
+        if self._loaded is None:
+            self._loaded = getattr(importlib.import_module(self.module), self.definition)
+        return self._loaded
+
+    @property
+    def tool_function(self) -> Callable:
+        return self._load()["tool_function"]
+
+    @tool_function.setter
+    def tool_function(self, value: Optional[Callable]):
+        if value is not None:
+            self._loaded = {"tool_function": value}
+
+    @property
+    def async_tool_function(self) -> Optional[Callable]:
+        return self._load().get("async_tool_function")
+
+    @async_tool_function.setter
+    def async_tool_function(self, value: Optional[Callable]):
+        if value is not None:
+            self._loaded = dict(self._load(), async_tool_function=value)
+
+# Bump when the manifest layout or what _parse_definitions extracts changes
+_MANIFEST_VERSION = 2
+
+def discover_tools(package: str = "tools") -> List[ToolDefinition]:
+    """Find every *_DEFINITION in the package's modules without importing them.
+
+    Each module's source is parsed and the literal parts of its definition
+    dicts are read straight from the syntax tree; tool_function is resolved on
+    first call. A definition whose other fields are not plain literals falls
+    back to importing its module. Parsed definitions are cached in the
+    package's __pycache__ keyed by file mtime and size, so a normal startup
+    only stats the tool files. Tools come back sorted by module name so the
+    tool list (and the prompt cache built on it) is stable between runs.
+    """
+    spec = importlib.util.find_spec(package)
+    tools: List[ToolDefinition] = []
+    for directory in spec.submodule_search_locations:
+        manifest_path = os.path.join(directory, "__pycache__", "tool_manifest.json")
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            manifest = {}
+        if manifest.get("version") != _MANIFEST_VERSION:
+            manifest = {}
+
+        fresh: Dict[str, Any] = {"version": _MANIFEST_VERSION}
+        for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+            if not entry.name.endswith(".py") or entry.name.startswith("_"):
+                continue
+            stat = entry.stat()
+            cached = manifest.get(entry.name)
+            if cached is None or cached["mtime_ns"] != stat.st_mtime_ns or cached["size"] != stat.st_size:
+                cached = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                          "definitions": _parse_definitions(entry.path)}
+            fresh[entry.name] = cached
+
+            module = f"{package}.{entry.name[:-3]}"
+            for found in cached["definitions"]:
+                if found["fields"] is None:
+                    tools.append(ToolDefinition(**getattr(importlib.import_module(module), found["definition"])))
+                else:
+                    tools.append(LazyToolDefinition(module, found["definition"], **found["fields"]))
+
+        if fresh != manifest:
+            try:
+                os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+                with open(manifest_path, "w", encoding="utf-8") as file:
+                    json.dump(fresh, file)
+            except OSError:
+                pass
+    return tools
+
+def _parse_definitions(path: str) -> List[Dict[str, Any]]:
+    """Return the module's *_DEFINITION dicts without tool_function; fields is None if they are not literals."""
+    import ast
+
+    with open(path, "r", encoding="utf-8") as file:
+        tree = ast.parse(file.read(), path)
+    definitions = []
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name) and node.targets[0].id.endswith("_DEFINITION")
+                and isinstance(node.value, ast.Dict)):
+            fields: Optional[Dict[str, Any]] = {}
+            try:
+                for key, value in zip(node.value.keys, node.value.values):
+                    field = ast.literal_eval(key)
+                    if field not in ("tool_function", "async_tool_function"):
+                        fields[field] = ast.literal_eval(value)
+            except ValueError:
+                fields = None
+            definitions.append({"definition": node.targets[0].id, "fields": fields})
+    return definitions
+
+class ToolDispatcher:
+    """Runs tool calls on a thread pool while keeping conflicting calls in order.
+
+    Read-only calls run in parallel with each other. Mutating calls hold a
+    per-path lock: each path maps to the future of the last mutating call that
+    claimed it, and later calls touching an overlapping path wait for it first.
+    Mutating calls also wait for earlier reads of overlapping paths. Calls are
+    submitted in message order, so the waits always point backwards.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self._lock = threading.Lock()
+        # Path keys are absolute paths; None stands for "the whole tree".
+        self._path_locks: Dict[Optional[str], Future] = {}
+        self._path_readers: Dict[Optional[str], List[Future]] = {}
+
+    def submit(self, call: Callable[[], Any], read_only: bool, paths: Optional[List[str]]) -> Future:
+        with self._lock:
+            waits_on = self._waits_for(read_only, paths)
+            future = self._executor.submit(self._run_after, waits_on, call)
+            self._claim(future, read_only, paths)
+            return future
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def _waits_for(self, read_only: bool, paths: Optional[List[str]]) -> List[Any]:
+        self._release_finished()
+        keys = [None] if paths is None else paths
+        waits_on = self._conflicts(keys, self._path_locks.items())
+        if not read_only:
+            readers = [(key, f) for key, futures in self._path_readers.items() for f in futures]
+            waits_on.extend(self._conflicts(keys, readers))
+        return waits_on
+
+    def _claim(self, future: Any, read_only: bool, paths: Optional[List[str]]):
+        for key in [None] if paths is None else paths:
+            if read_only:
+                self._path_readers.setdefault(key, []).append(future)
+            else:
+                self._path_locks[key] = future
+
+    @staticmethod
+    def _conflicts(keys: List[Optional[str]], claims) -> List[Future]:
+        return [future for claimed, future in claims
+                if any(_paths_overlap(claimed, key) for key in keys)]
+
+    def _release_finished(self):
+        for key in [k for k, f in self._path_locks.items() if f.done()]:
+            del self._path_locks[key]
+        for key, futures in list(self._path_readers.items()):
+            futures[:] = [f for f in futures if not f.done()]
+            if not futures:
+                del self._path_readers[key]
+
+    @staticmethod
+    def _run_after(waits_on: List[Future], call: Callable[[], Any]) -> Any:
+        # Earlier submissions are already running or finished (the pool is FIFO),
+        # so waiting here cannot starve the pool.
+        wait(waits_on)
+        return call()
+
+class AsyncToolDispatcher(ToolDispatcher):
+    """ToolDispatcher for coroutine tool calls: same path locks, with asyncio tasks instead of threads.
+
+    It lives on one event loop, so the bookkeeping needs no lock.
+    """
+
+    def __init__(self, max_concurrency: int = 8):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._path_locks: Dict[Optional[str], asyncio.Task] = {}
+        self._path_readers: Dict[Optional[str], List[asyncio.Task]] = {}
+
+    def submit(self, call: Callable[[], Awaitable[Any]], read_only: bool,
+               paths: Optional[List[str]]) -> asyncio.Task:
+        waits_on = self._waits_for(read_only, paths)
+        task = asyncio.ensure_future(self._run_after(waits_on, call, self._semaphore))
+        self._claim(task, read_only, paths)
+        return task
+
+    def shutdown(self):
+        pass
+
+    @staticmethod
+    async def _run_after(waits_on: List[asyncio.Task], call: Callable[[], Awaitable[Any]],
+                         semaphore: asyncio.Semaphore) -> Any:
+        # Take a slot only once the calls we wait for are done, so they can always get one
+        if waits_on:
+            await asyncio.wait(waits_on)
+        async with semaphore:
+            return await call()
+
+def _paths_overlap(a: Optional[str], b: Optional[str]) -> bool:
+    if a is None or b is None:
+        return True
+    return a == b or a.startswith(b.rstrip(os.sep) + os.sep) or b.startswith(a.rstrip(os.sep) + os.sep)
+
+class ToolInputError(ValueError):
+    """Raised when a tool call's input does not match the tool's input_schema."""
+
+_JSON_TYPES: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+    "null": lambda v: v is None,
+}
+
+def compile_schema(schema: Dict[str, Any]) -> Callable[[Any, str], None]:
+    """Compile a JSON schema into a function that raises ToolInputError for invalid values.
+
+    Covers the subset of JSON schema the tool definitions use: type, enum,
+    properties, required, additionalProperties, items and numeric/size bounds.
+    """
+    checks: List[Callable[[Any, str], None]] = []
+
+    if "type" in schema:
+        names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        type_checks = [_JSON_TYPES[name] for name in names]
+        expected = " or ".join(names)
+        def check_type(value, where):
+            if not any(check(value) for check in type_checks):
+                raise ToolInputError(f"{where} must be of type {expected}, got {type(value).__name__}")
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+        def check_enum(value, where):
+            if value not in allowed:
+                raise ToolInputError(f"{where} must be one of {allowed}, got {value!r}")
+        checks.append(check_enum)
+
+    for keyword, compare, message in (("minimum", lambda v, b: v >= b, "at least"),
+                                      ("maximum", lambda v, b: v <= b, "at most")):
+        if keyword in schema:
+            def check_bound(value, where, bound=schema[keyword], compare=compare, message=message):
+                if _JSON_TYPES["number"](value) and not compare(value, bound):
+                    raise ToolInputError(f"{where} must be {message} {bound}, got {value}")
+            checks.append(check_bound)
+
+    for keyword, compare, message in (("minItems", lambda n, b: n >= b, "at least"),
+                                      ("maxItems", lambda n, b: n <= b, "at most")):
+        if keyword in schema:
+            def check_size(value, where, bound=schema[keyword], compare=compare, message=message):
+                if isinstance(value, list) and not compare(len(value), bound):
+                    raise ToolInputError(f"{where} must have {message} {bound} items, got {len(value)}")
+            checks.append(check_size)
+
+    if "items" in schema:
+        validate_item = compile_schema(schema["items"])
+        def check_items(value, where):
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    validate_item(item, f"{where}[{index}]")
+        checks.append(check_items)
+
+    properties = {key: compile_schema(sub) for key, sub in schema.get("properties", {}).items()}
+    required = list(schema.get("required", []))
+    additional = schema.get("additionalProperties", True)
+    validate_additional = compile_schema(additional) if isinstance(additional, dict) else None
+    if properties or required or additional is not True:
+        def check_object(value, where):
+            if not isinstance(value, dict):
+                return
+            missing = [key for key in required if key not in value]
+            if missing:
+                raise ToolInputError(f"{where} is missing required field(s): {', '.join(missing)}")
+            for key, item in value.items():
+                if key in properties:
+                    properties[key](item, f"{where}.{key}")
+                elif additional is False:
+                    raise ToolInputError(f"{where} has unexpected field '{key}'")
+                elif validate_additional is not None:
+                    validate_additional(item, f"{where}.{key}")
+        checks.append(check_object)
+
+    def validate(value: Any, where: str = "input") -> None:
+        for check in checks:
+            check(value, where)
+    return validate
+
+class ToolRegistry:
+    """Tools indexed by name, with their API payloads and input validators built once.
+
+    Each tool's ToolParam is built when the tool is added and reused for every
+    request; adding or removing a tool only touches that tool's entry.
+    """
+
+    def __init__(self, tools: List[ToolDefinition] = ()):
+        self._tools: Dict[str, ToolDefinition] = {}
+        self._params: Dict[str, anthropic.types.ToolParam] = {}
+        self._validators: Dict[str, Callable[[Any, str], None]] = {}
+        self._payloads: Dict[bool, List[anthropic.types.ToolParam]] = {}
+        for tool in tools:
+            self.add(tool)
+
+    def add(self, tool: ToolDefinition):
+        """Register a tool, replacing any existing tool with the same name."""
+        self._tools[tool.name] = tool
+        self._params[tool.name] = {
+            "name": tool.name, "description": tool.description, "input_schema": copy.deepcopy(tool.input_schema),
+        }
+        self._validators[tool.name] = compile_schema(tool.input_schema)
+        self._payloads.clear()
+
+    def remove(self, name: str) -> ToolDefinition:
+        tool = self._tools.pop(name)
+        del self._params[name]
+        del self._validators[name]
+        self._payloads.clear()
+        return tool
+
+    def get(self, name: str) -> Optional[ToolDefinition]:
+        return self._tools.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __iter__(self):
+        return iter(self._tools.values())
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def api_payload(self, cache_control: bool = False) -> List[anthropic.types.ToolParam]:
+        """Return the tools list for messages.create; with cache_control the last tool carries a cache breakpoint.
+
+        The list is shared between requests and must not be mutated.
+        """
+        payload = self._payloads.get(cache_control)
+        if payload is None:
+            payload = list(self._params.values())
+            if cache_control and payload:
+                payload[-1] = dict(payload[-1], cache_control={"type": "ephemeral"})
+            self._payloads[cache_control] = payload
+        return payload
+
+    def validate(self, name: str, tool_input: Any):
+        """Raise ToolInputError if tool_input does not match the named tool's input_schema."""
+        self._validators[name](tool_input, "input")
+
+class ContextWindow:
+    """The conversation sent to the model, kept under an estimated token budget.
+
+    Token counts are estimated per message (about four characters per token)
+    and cached, so checking the budget costs nothing per turn. Once the total
+    passes budget_tokens, compact() works from the oldest message forward,
+    leaving the last keep_recent messages verbatim: first it trims old
+    tool_result payloads and long tool_use inputs to their head and tail, then,
+    if that is not enough, it drops whole early exchanges. It compacts down to
+    low_watermark * budget_tokens so the cached prompt prefix is only
+    invalidated once in a while, not every turn.
+    """
+
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, budget_tokens: int = 150_000, keep_recent: int = 6,
+                 low_watermark: float = 0.75, trimmed_chars: int = 2_000):
+        self.budget_tokens: int = budget_tokens
+        self.keep_recent: int = keep_recent
+        self.low_watermark: float = low_watermark
+        self.trimmed_chars: int = trimmed_chars
+        self.messages: List[Dict[str, Any]] = []
+        self._tokens: List[int] = []
+
+    def append(self, message: Dict[str, Any]):
+        self.messages.append(message)
+        self._tokens.append(self.estimate_tokens(message))
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self._tokens)
+
+    @classmethod
+    def estimate_tokens(cls, message: Dict[str, Any]) -> int:
+        return len(json.dumps(message, ensure_ascii=False, default=str)) // cls.CHARS_PER_TOKEN + 1
+
+    def compact(self) -> bool:
+        """Shrink old messages if the budget is exceeded; return True if anything changed."""
+        if self.total_tokens <= self.budget_tokens:
+            return False
+        target = int(self.budget_tokens * self.low_watermark)
+        old = max(len(self.messages) - self.keep_recent, 0)
+        changed = False
+
+        for index in range(old):
+            if self.total_tokens <= target:
+                return changed
+            compacted = self._trim_message(self.messages[index])
+            if compacted is not None:
+                self.messages[index] = compacted
+                self._tokens[index] = self.estimate_tokens(compacted)
+                changed = True
+
+        if self.total_tokens > target:
+            count = len(self.messages)
+            self._drop_early_exchanges(target, old)
+            changed = changed or len(self.messages) != count
+        return changed
+
+    def _trim_message(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not isinstance(message["content"], list):
+            return None
+        changed = False
+        blocks = []
+        for block in message["content"]:
+            if block.get("type") == "tool_result" and isinstance(block.get("content"), str):
+                trimmed = self._trim_text(block["content"])
+                if trimmed is not block["content"]:
+                    block = dict(block, content=trimmed)
+                    changed = True
+            elif block.get("type") == "tool_use":
+                tool_input = {key: self._trim_text(value) if isinstance(value, str) else value
+                              for key, value in block["input"].items()}
+                if any(tool_input[key] is not value for key, value in block["input"].items()):
+                    block = dict(block, input=tool_input)
+                    changed = True
+            blocks.append(block)
+        return dict(message, content=blocks) if changed else None
+
+    def _trim_text(self, text: str) -> str:
+        if len(text) <= self.trimmed_chars:
+            return text
+        half = self.trimmed_chars // 2
+        middle = text[half:len(text) - half]
+        if middle.startswith("\n[... ") and middle.endswith(" characters elided to save context ...]\n"):
+            # Trimmed on an earlier pass; the marker makes it a little longer than trimmed_chars
+            return text
+        elided = len(text) - 2 * half
+        return f"{text[:half]}\n[... {elided} characters elided to save context ...]\n{text[-half:]}"
+
+    def _drop_early_exchanges(self, target: int, old: int):
+        # Only cut right before a user message that starts a new exchange (plain
+        # text, not tool results), so every tool_use keeps its tool_result.
+        cut = 0
+        dropped = 0
+        for index in range(1, old + 1):
+            if index < len(self.messages) and self._starts_exchange(self.messages[index]):
+                cut = index
+                dropped = sum(self._tokens[:cut])
+                if self.total_tokens - dropped <= target:
+                    break
+        if cut == 0:
+            return
+        note = {"type": "text", "text": f"[{cut} earlier messages were removed to stay within the context budget]"}
+        first = self.messages[cut]
+        content = first["content"]
+        blocks = [{"type": "text", "text": content}] if isinstance(content, str) else list(content)
+        del self.messages[:cut]
+        del self._tokens[:cut]
+        self.messages[0] = dict(first, content=[note] + blocks)
+        self._tokens[0] = self.estimate_tokens(self.messages[0])
+
+    @staticmethod
+    def _starts_exchange(message: Dict[str, Any]) -> bool:
+        if message["role"] != "user":
+            return False
+        content = message["content"]
+        return isinstance(content, str) or all(block.get("type") != "tool_result" for block in content)
+
+def _with_cache_control(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of message whose last content block carries an ephemeral cache_control marker."""
+    content = message["content"]
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}]
+    else:
+        blocks = list(content)
+    blocks[-1] = dict(blocks[-1], cache_control={"type": "ephemeral"})
+    return dict(message, content=blocks)
 
 class Agent:
-    def __init__(self, client: anthropic.Client, get_user_input: Callable[[], str], tools: List[ToolDefinition]):
+    def __init__(self, client: anthropic.Client, get_user_input: Callable[[], str],
+                 tools: Union[ToolRegistry, List[ToolDefinition]],
+                 max_parallel_tools: int = 8, stream: bool = False, prompt_caching: bool = True,
+                 context: Optional[ContextWindow] = None, verbose: bool = True):
         self.client: anthropic.Client = client
         self.get_user_input: Callable[[], str] = get_user_input
-        self.tools: List[ToolDefinition] = tools
+        self.tools: ToolRegistry = tools if isinstance(tools, ToolRegistry) else ToolRegistry(tools)
+        self.dispatcher: ToolDispatcher = ToolDispatcher(max_workers=max_parallel_tools)
+        self.stream: bool = stream
+        # Tool calls started mid-stream, keyed by tool_use id
+        self._started_tools: Dict[str, Future] = {}
+        self.prompt_caching: bool = prompt_caching
+        # Index of the message that carried the conversation cache breakpoint last turn
+        self._cache_breakpoint: Optional[int] = None
+        self.context: ContextWindow = context if context is not None else ContextWindow()
+        self.usage: Dict[str, int] = {
+            "input_tokens": 0, "output_tokens": 0, "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0,
+        }
+        # When False the agent prints nothing, e.g. for headless batch runs
+        self.verbose: bool = verbose
 
-    def run(self):
-        conversation: List[Dict[str, Any]] = []
+    def log(self, *args, **kwargs):
+        if self.verbose:
+            print(*args, **kwargs)
 
-        print("Chat with Claude (Ctrl-C to quit)")
+    def run(self):
+        self.log("Chat with Claude (Ctrl-C to quit)")
 
         read_user_input = True
         while True:
             if read_user_input:
-                print("You: ", end="", flush=True)
+                self.log("You: ", end="", flush=True)
                 try:
                     user_input = self.get_user_input()
                 except Exception as e:
                     break
                 
                 user_message: Dict[str, Any] = {"role": "user", "content": user_input}
-                conversation.append(user_message)
+                self.context.append(user_message)
             
-            message = self.run_inference(conversation)
+            self.compact_context()
+            message = self.run_inference(self.context.messages)
             if message is None:
                 break
 
-            # Build assistant message content
-            assistant_content = []
-            tool_results = []
-            
+            tool_futures: List[Future] = []
             for content in message.content:
-                if content.type == "text":
-                    assistant_content.append({
-                        "type": "text",
-                        "text": content.text
-                    })
-                    print(f"Claude: {content.text}")
+                if content.type == "text" and not self.stream:
+                    self.log(f"Claude: {content.text}")
                 elif content.type == "tool_use":
-                    assistant_content.append({
-                        "type": "tool_use",
-                        "id": content.id,
-                        "name": content.name,
-                        "input": content.input
-                    })
-                    result = self.execute_tool(content.id, content.name, content.input)
-                    tool_results.append(result)
+                    future = self._started_tools.pop(content.id, None)
+                    if future is None:
+                        future = self.submit_tool(content.id, content.name, content.input)
+                    tool_futures.append(future)
             
-            # Add assistant message with all content (text and tool uses)
-            if assistant_content:
-                conversation.append({
-                    "role": "assistant", 
-                    "content": assistant_content
-                })
+            # Independent tools run concurrently; results keep the tool_use order
+            tool_results = [future.result() for future in tool_futures]
+            self.record_turn(message, tool_results)
             
-            # Add tool results as part of the next user message
-            if tool_results:
-                # Create a user message with tool results
-                user_content = []
-                for result in tool_results:
-                    user_content.append({
-                        "type": "tool_result",
-                        "tool_use_id": result["tool_use_id"],
-                        "content": result["content"]
-                    })
-                
-                conversation.append({
-                    "role": "user",
-                    "content": user_content
+            read_user_input = len(tool_results) == 0
+
+    def compact_context(self):
+        if self.context.compact():
+            # The prefix changed, so last turn's cache breakpoint no longer lines up
+            self._cache_breakpoint = None
+            self.log(f"🗜️  Compacted conversation to ~{self.context.total_tokens} tokens")
+
+    def record_turn(self, message: Message, tool_results: List[Dict[str, Any]]):
+        """Append the assistant message and, if tools ran, the user message carrying their results."""
+        assistant_content = []
+        for content in message.content:
+            if content.type == "text":
+                assistant_content.append({
+                    "type": "text",
+                    "text": content.text
+                })
+            elif content.type == "tool_use":
+                assistant_content.append({
+                    "type": "tool_use",
+                    "id": content.id,
+                    "name": content.name,
+                    "input": content.input
+                })
+
+        # Add assistant message with all content (text and tool uses)
+        if assistant_content:
+            self.context.append({
+                "role": "assistant", 
+                "content": assistant_content
+            })
+        
+        # Add tool results as part of the next user message
+        if tool_results:
+            user_content = []
+            for result in tool_results:
+                user_content.append({
+                    "type": "tool_result",
+                    "tool_use_id": result["tool_use_id"],
+                    "content": result["content"],
+                    "is_error": result["is_error"]
                 })
             
-            read_user_input = len(tool_results) == 0
-    
+            self.context.append({
+                "role": "user",
+                "content": user_content
+            })
             
     def run_inference(self, conversation: List[Dict[str, Any]]) -> Dict[str, Any]:
-        tools = [anthropic.types.ToolParam(
-                name=tool.name, description=tool.description, input_schema=tool.input_schema
-            )
-            for tool in self.tools]
+        request = self.build_request(conversation)
+        if self.stream:
+            message = self.stream_inference(request)
+        else:
+            message: Message = self.client.messages.create(**request)
+        self.report_usage(message)
+        return message
+
+    def build_request(self, conversation: List[Dict[str, Any]]) -> Dict[str, Any]:
+        tools = self.tools.api_payload(cache_control=self.prompt_caching)
+        if self.prompt_caching:
+            conversation = self.add_cache_breakpoints(conversation)
 
-        message: Message = self.client.messages.create(
+        return dict(
             model="claude-3-7-sonnet-20250219",
             messages=conversation,
             max_tokens=1024,
             tools=tools,
         )
-        return message
 
+    def add_cache_breakpoints(self, conversation: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return a copy of conversation carrying prompt-cache breakpoints.
+
+        The last message writes the prefix for the next turn and last turn's
+        breakpoint is kept so that request reads back the prefix it wrote.
+        Together with the breakpoint on the last tool that makes three, under
+        the API limit of four.
+        """
+        if not conversation:
+            return conversation
+
+        last = len(conversation) - 1
+        breakpoints = {last}
+        if self._cache_breakpoint is not None and self._cache_breakpoint < last:
+            breakpoints.add(self._cache_breakpoint)
+        self._cache_breakpoint = last
+
+        conversation = list(conversation)
+        for index in breakpoints:
+            conversation[index] = _with_cache_control(conversation[index])
+        return conversation
+
+    def report_usage(self, message: Message):
+        """Print this turn's token usage, including prompt-cache reads and writes, and add it to the totals."""
+        usage = getattr(message, "usage", None)
+        if usage is None:
+            return
+        turn = {key: getattr(usage, key, None) or 0 for key in self.usage}
+        for key, value in turn.items():
+            self.usage[key] += value
+        self.log(f"📊 Tokens: {turn['input_tokens']} in "
+              f"(cache read {turn['cache_read_input_tokens']}, cache write {turn['cache_creation_input_tokens']}), "
+              f"{turn['output_tokens']} out")
+
+    def stream_inference(self, request: Dict[str, Any]) -> Message:
+        """Stream a response, printing text as it arrives and starting tools as soon as their input is complete."""
+        with self.client.messages.stream(**request) as stream:
+            for event in stream:
+                self.handle_stream_event(event)
+            return stream.get_final_message()
+
+    def handle_stream_event(self, event: Any):
+        if event.type == "content_block_start" and event.content_block.type == "text":
+            self.log("Claude: ", end="", flush=True)
+        elif event.type == "text":
+            self.log(event.text, end="", flush=True)
+        elif event.type == "content_block_stop":
+            block = event.content_block
+            if block.type == "text":
+                self.log()
+            elif block.type == "tool_use":
+                # The block's input JSON is final here; run it while the rest of the message streams
+                self._started_tools[block.id] = self.submit_tool(block.id, block.name, block.input)
+
+    def submit_tool(self, tool_id: str, tool_name: str, tool_input: Dict[str, Any]) -> Future:
+        """Schedule a tool call on the dispatcher and return a future for its result."""
+        tool = self.tools.get(tool_name)
+        call = lambda: self.execute_tool(tool_id, tool_name, tool_input)
+        if not tool:
+            return self.dispatcher.submit(call, read_only=True, paths=[])
+        return self.dispatcher.submit(call, read_only=tool.read_only, paths=tool.touched_paths(tool_input))
         
     def execute_tool(self, tool_id: str, tool_name: str, tool_input: Dict[str, Any]):
-        tool = next((t for t in self.tools if t.name == tool_name), None)
+        tool, error = self.check_tool_call(tool_id, tool_name, tool_input)
+        if error:
+            return error
+        try:
+            response = tool.tool_function(**tool_input)
+            self.log(f"✅ Tool Result: {response}")
+            return {"tool_use_id": tool_id, "content": response, "is_error": False}
+        except Exception as e:
+            self.log(f"❌ Tool Error: {str(e)}")
+            return {"tool_use_id": tool_id, "content": str(e), "is_error": True}
+
+    def check_tool_call(self, tool_id: str, tool_name: str, tool_input: Dict[str, Any]):
+        """Look up and validate a tool call; return (tool, None), or (None, error result) if it cannot run."""
+        tool = self.tools.get(tool_name)
         if not tool:
-            return {"tool_use_id": tool_id, "content": "tool not found", "is_error": True}
+            return None, {"tool_use_id": tool_id, "content": "tool not found", "is_error": True}
         
-        print(f"🔧 Tool Call: {tool_name}({tool_input})")
-        print(f"🔍 Tool Input Keys: {list(tool_input.keys())}")
-        print(f"🔍 Tool Input Values: {list(tool_input.values())}")
+        self.log(f"🔧 Tool Call: {tool_name}({tool_input})")
+        self.log(f"🔍 Tool Input Keys: {list(tool_input.keys())}")
+        self.log(f"🔍 Tool Input Values: {list(tool_input.values())}")
         try:
-            response = tool.tool_function(**tool_input)
-            print(f"✅ Tool Result: {response}")
+            self.tools.validate(tool_name, tool_input)
+        except ToolInputError as e:
+            self.log(f"❌ Invalid Tool Input: {str(e)}")
+            return None, {"tool_use_id": tool_id, "content": f"Invalid input for {tool_name}: {str(e)}", "is_error": True}
+        return tool, None
+
+class AsyncAgent(Agent):
+    """An Agent driven by asyncio, for serving many sessions from one process.
+
+    Uses an anthropic.AsyncAnthropic client, runs tools as asyncio tasks (tools
+    with an async_tool_function, such as the subprocess-based ones, run on the
+    event loop; the rest run on the default thread pool), and reads input from
+    get_user_input, which may be a coroutine function. run(), run_inference()
+    and execute_tool() are coroutines here.
+    """
+
+    def __init__(self, client: anthropic.AsyncAnthropic, get_user_input: Callable[[], Any],
+                 tools: Union[ToolRegistry, List[ToolDefinition]],
+                 max_parallel_tools: int = 8, stream: bool = False, prompt_caching: bool = True,
+                 context: Optional[ContextWindow] = None, verbose: bool = True):
+        super().__init__(client, get_user_input, tools, max_parallel_tools=max_parallel_tools, stream=stream,
+                         prompt_caching=prompt_caching, context=context, verbose=verbose)
+        self.dispatcher = AsyncToolDispatcher(max_concurrency=max_parallel_tools)
+
+    async def run(self):
+        self.log("Chat with Claude (Ctrl-C to quit)")
+
+        read_user_input = True
+        while True:
+            if read_user_input:
+                self.log("You: ", end="", flush=True)
+                try:
+                    user_input = await self.read_user_input()
+                except Exception as e:
+                    break
+
+                self.context.append({"role": "user", "content": user_input})
+
+            self.compact_context()
+            message = await self.run_inference(self.context.messages)
+            if message is None:
+                break
+
+            tool_tasks = []
+            for content in message.content:
+                if content.type == "text" and not self.stream:
+                    self.log(f"Claude: {content.text}")
+                elif content.type == "tool_use":
+                    task = self._started_tools.pop(content.id, None)
+                    if task is None:
+                        task = self.submit_tool(content.id, content.name, content.input)
+                    tool_tasks.append(task)
+
+            tool_results = list(await asyncio.gather(*tool_tasks))
+            self.record_turn(message, tool_results)
+
+            read_user_input = len(tool_results) == 0
+
+    async def read_user_input(self) -> str:
+        if inspect.iscoroutinefunction(self.get_user_input):
+            return await self.get_user_input()
+        return await asyncio.to_thread(self.get_user_input)
+
+    async def run_inference(self, conversation: List[Dict[str, Any]]) -> Message:
+        request = self.build_request(conversation)
+        if self.stream:
+            message = await self.stream_inference(request)
+        else:
+            message = await self.client.messages.create(**request)
+        self.report_usage(message)
+        return message
+
+    async def stream_inference(self, request: Dict[str, Any]) -> Message:
+        async with self.client.messages.stream(**request) as stream:
+            async for event in stream:
+                self.handle_stream_event(event)
+            return await stream.get_final_message()
+
+    async def execute_tool(self, tool_id: str, tool_name: str, tool_input: Dict[str, Any]):
+        tool, error = self.check_tool_call(tool_id, tool_name, tool_input)
+        if error:
+            return error
+        try:
+            if tool.async_tool_function is not None:
+                response = await tool.async_tool_function(**tool_input)
+            else:
+                response = await asyncio.to_thread(tool.tool_function, **tool_input)
+            self.log(f"✅ Tool Result: {response}")
             return {"tool_use_id": tool_id, "content": response, "is_error": False}
         except Exception as e:
-            print(f"❌ Tool Error: {str(e)}")
+            self.log(f"❌ Tool Error: {str(e)}")
             return {"tool_use_id": tool_id, "content": str(e), "is_error": True}
 
 class Tool:
@@ -143,28 +846,58 @@ class Tool:
         self.description = description
         self.parameters = parameters
         
+class BackgroundClient:
+    """Builds the API client on a background thread; the first attribute access waits for it.
+
+    Importing anthropic is the bulk of the agent's startup time, so main() lets
+    it happen while the user types the first prompt.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="client")
+        self._client: Future = executor.submit(factory)
+        executor.shutdown(wait=False)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client.result(), name)
+
+def _create_client() -> anthropic.Anthropic:
+    import anthropic
+    import dotenv
+
+    dotenv.load_dotenv()
+    return anthropic.Anthropic()
+
+def _create_async_client() -> anthropic.AsyncAnthropic:
+    import anthropic
+    import dotenv
+
+    dotenv.load_dotenv()
+    return anthropic.AsyncAnthropic()
+
 def main():
-    client = anthropic.Anthropic()
-    tools: List[ToolDefinition] = [
-        ToolDefinition(**READ_FILE_DEFINITION),
-        ToolDefinition(**LIST_DIRECTORY_DEFINITION),
-        ToolDefinition(**EDIT_FILE_DEFINITION),
-        ToolDefinition(**CREATE_FILE_DEFINITION),
-        ToolDefinition(**DELETE_FILE_DEFINITION),
-        ToolDefinition(**MOVE_FILE_DEFINITION),
-        ToolDefinition(**SEARCH_FILES_DEFINITION),
-        ToolDefinition(**GET_FILE_INFO_DEFINITION),
-        ToolDefinition(**CREATE_DIRECTORY_DEFINITION),
-        ToolDefinition(**DELETE_DIRECTORY_DEFINITION),
-        ToolDefinition(**MOVE_DIRECTORY_DEFINITION),
-        ToolDefinition(**COPY_DIRECTORY_DEFINITION),
-        ToolDefinition(**CLEAN_DIRECTORY_DEFINITION),
-        ToolDefinition(**RUN_SCRIPT_DEFINITION),
-        ToolDefinition(**RUN_TESTS_DEFINITION),
-        ToolDefinition(**LINT_CODE_DEFINITION),
-        ToolDefinition(**INSTALL_PACKAGE_DEFINITION)
-    ]
-    agent = Agent(client, input, tools)
+    parser = argparse.ArgumentParser(description="Chat with Claude and let it use local tools.")
+    parser.add_argument("--stream", action="store_true", help="Stream responses and start tools mid-message.")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Run the session on asyncio with the AsyncAnthropic client.")
+    parser.add_argument("--context-budget", type=int, default=150_000,
+                        help="Estimated token budget for the conversation before old tool output is compacted.")
+    options = parser.parse_args()
+
+    # Long-running commands (tests, installs, scripts) report their latest output line while they run
+    from tools.subprocess_runner import set_progress_handler
+    set_progress_handler(print)
+
+    tools = ToolRegistry(discover_tools())
+    context = ContextWindow(budget_tokens=options.context_budget)
+    if options.use_async:
+        agent = AsyncAgent(BackgroundClient(_create_async_client), input, tools, stream=options.stream,
+                           context=context)
+        asyncio.run(agent.run())
+        return
+
+    client = BackgroundClient(_create_client)
+    agent = Agent(client, input, tools, stream=options.stream, context=context)
     agent.run()
        
 
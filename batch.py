@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Headless batch runner for the agent.
+
+Runs every task in a JSONL file as an independent Agent session, with at
+most --concurrency sessions in flight, and streams one JSON result line per
+task to the output as soon as that task finishes.
+
+Task lines:
+    {"id": "fix-typo", "prompt": "Fix the typo in README.md"}
+    {"id": "two-step", "prompts": ["Add a test for foo", "Now run it"], "max_turns": 20}
+
+Result lines:
+    {"id": ..., "status": "ok" | "max_turns" | "error", "response": <last assistant text>,
+     "turns": ..., "tool_calls": ..., "retries": ..., "elapsed_s": ..., "usage": {...}, "error": ...}
+
+Rate-limit (429), overloaded (529) and server error (5xx) responses, and
+connection errors, are retried with exponential backoff and jitter, honouring
+the server's retry-after header. All sessions
+share the working directory, so tasks that edit files should not overlap.
+
+Usage:
+    python batch.py tasks.jsonl -o results.jsonl --concurrency 8
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+import anthropic
+import dotenv
+
+from agent import Agent, ToolRegistry, discover_tools
+from tools import file_cache
+
+RETRYABLE_STATUS = (429, 529)
+
+class BatchAgent(Agent):
+    """An Agent fed from a task's prompts that stays quiet and backs off on rate limits and transient errors."""
+
+    def __init__(self, client: anthropic.Anthropic, prompts: List[str], tools: ToolRegistry,
+                 max_turns: int = 50, max_retries: int = 6, **kwargs):
+        self._prompts = iter(prompts)
+        # run() stops when get_user_input raises, which next() does once the prompts run out
+        super().__init__(client, lambda: next(self._prompts), tools, verbose=False, **kwargs)
+        self.max_turns: int = max_turns
+        self.max_retries: int = max_retries
+        self.turns: int = 0
+        self.tool_calls: int = 0
+        self.retries: int = 0
+        self.hit_max_turns: bool = False
+        self.response: str = ""
+
+    def run_inference(self, conversation: List[Dict[str, Any]]):
+        if self.turns >= self.max_turns:
+            self.hit_max_turns = True
+            return None
+        self.turns += 1
+
+        attempt = 0
+        while True:
+            try:
+                message = super().run_inference(conversation)
+                break
+            except (anthropic.APIStatusError, anthropic.APIConnectionError) as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                time.sleep(retry_delay(e, attempt))
+                attempt += 1
+                self.retries += 1
+
+        texts = [content.text for content in message.content if content.type == "text"]
+        if texts:
+            self.response = "\n".join(texts)
+        self.tool_calls += sum(1 for content in message.content if content.type == "tool_use")
+        return message
+
+def is_retryable(error: anthropic.APIError) -> bool:
+    """Whether a failed request is worth retrying: rate limits, overload, server errors and lost connections."""
+    if isinstance(error, (anthropic.APIConnectionError, anthropic.InternalServerError)):
+        return True
+    return isinstance(error, anthropic.APIStatusError) and error.status_code in RETRYABLE_STATUS
+
+def retry_delay(error: anthropic.APIError, attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Seconds to wait before retrying: the server's retry-after if given, else capped exponential backoff with full jitter."""
+    # Connection errors have no response to take a retry-after from
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), cap)
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def run_task(client: anthropic.Anthropic, tools: ToolRegistry, task: Dict[str, Any],
+             max_turns: int, max_retries: int) -> Dict[str, Any]:
+    """Run one task as its own session and return its result record."""
+    prompts = task["prompts"] if "prompts" in task else [task["prompt"]]
+    agent = BatchAgent(client, prompts, tools, max_turns=task.get("max_turns", max_turns), max_retries=max_retries)
+    result: Dict[str, Any] = {"id": task["id"], "status": "ok", "error": None}
+    start = time.perf_counter()
+    try:
+        agent.run()
+        if agent.hit_max_turns:
+            result["status"] = "max_turns"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {str(e)}"
+    finally:
+        agent.dispatcher.shutdown()
+
+    result.update({
+        "response": agent.response,
+        "turns": agent.turns,
+        "tool_calls": agent.tool_calls,
+        "retries": agent.retries,
+        "elapsed_s": round(time.perf_counter() - start, 3),
+        "usage": agent.usage,
+    })
+    return result
+
+def load_tasks(path: str) -> List[Dict[str, Any]]:
+    tasks = []
+    with open(path, "r", encoding="utf-8") as file:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            task = json.loads(line)
+            if "prompt" not in task and "prompts" not in task:
+                raise ValueError(f"{path}:{number}: task needs a 'prompt' or 'prompts' field")
+            task.setdefault("id", str(number))
+            tasks.append(task)
+    return tasks
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run a JSONL file of tasks against the agent.")
+    parser.add_argument("tasks", help="JSONL file with one task per line.")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file for results. Defaults to stdout.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Sessions to run at once. Defaults to 4.")
+    parser.add_argument("--max-turns", type=int, default=50,
+                        help="Inference calls allowed per task unless the task sets max_turns. Defaults to 50.")
+    parser.add_argument("--max-retries", type=int, default=6,
+                        help="Retries per call on rate-limit, overloaded, server or connection errors. Defaults to 6.")
+    options = parser.parse_args(argv)
+
+    dotenv.load_dotenv()
+    tasks = load_tasks(options.tasks)
+    # Retries are handled by BatchAgent so the backoff sees every rate-limit, server and connection error
+    client = anthropic.Anthropic(max_retries=0)
+    tools = ToolRegistry(discover_tools())
+
+    output = sys.stdout if options.output == "-" else open(options.output, "w", encoding="utf-8")
+    counts: Dict[str, int] = {}
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=options.concurrency, thread_name_prefix="session") as executor:
+            futures = [executor.submit(run_task, client, tools, task, options.max_turns, options.max_retries)
+                       for task in tasks]
+            for future in as_completed(futures):
+                result = future.result()
+                counts[result["status"]] = counts.get(result["status"], 0) + 1
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    cache = file_cache.stats()
+    print(f"Ran {len(tasks)} tasks in {time.perf_counter() - start:.1f}s: {summary} "
+          f"(file cache: {cache['hits']} hits, {cache['misses']} misses)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the agent.
+
+Measures how long it takes from launching the interpreter until the first
+"You: " prompt is printed, comparing:
+
+    eager: the old startup, importing anthropic, dotenv and every tool module
+           and building all ToolDefinitions before the prompt
+    lazy:  `python agent.py`, which reads tool schemas from the cached manifest
+           and builds the API client in the background
+
+Usage:
+    python bench_startup.py [--runs N]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+EAGER = """
+import importlib, os
+import dotenv
+import anthropic
+from agent import ToolDefinition
+dotenv.load_dotenv()
+client = anthropic.Anthropic()
+tools = []
+for name in sorted(os.listdir("tools")):
+    if name.endswith(".py") and not name.startswith("_"):
+        module = importlib.import_module("tools." + name[:-3])
+        tools.extend(ToolDefinition(**value) for key, value in vars(module).items() if key.endswith("_DEFINITION"))
+print("Chat with Claude (Ctrl-C to quit)")
+print("You: ", end="", flush=True)
+"""
+
+def time_to_prompt(cmd):
+    """Return seconds until the process prints its first 'You: ' prompt."""
+    env = dict(os.environ, ANTHROPIC_API_KEY=os.environ.get("ANTHROPIC_API_KEY", "benchmark"))
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, cwd=ROOT, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    seen = b""
+    while b"You: " not in seen:
+        chunk = process.stdout.read1(1024)
+        if not chunk:
+            raise RuntimeError(f"{' '.join(cmd)} exited before prompting")
+        seen += chunk
+    elapsed = time.perf_counter() - start
+    process.stdin.close()
+    process.wait()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark agent startup time.")
+    parser.add_argument("--runs", type=int, default=10, help="Number of runs per mode. Defaults to 10.")
+    options = parser.parse_args()
+
+    modes = {
+        "eager": [sys.executable, "-c", EAGER],
+        "lazy": [sys.executable, "agent.py"],
+    }
+    # Warm the OS file cache and the tool manifest before timing
+    for cmd in modes.values():
+        time_to_prompt(cmd)
+
+    results = {}
+    for mode, cmd in modes.items():
+        samples = [time_to_prompt(cmd) for _ in range(options.runs)]
+        results[mode] = statistics.median(samples)
+        print(f"{mode:>5}: median {results[mode] * 1000:7.1f} ms  "
+              f"(min {min(samples) * 1000:.1f} ms, max {max(samples) * 1000:.1f} ms, {options.runs} runs)")
+
+    print(f"speedup: {results['eager'] / results['lazy']:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import os
 import sys
 from typing import Optional
 
+from .subprocess_runner import run_process, timeout_message
+
 def check_security(path: str = ".", scanner: str = "bandit", args: str = "") -> str:
     """Run security scanners to check for vulnerabilities and security issues."""
     try:
@@ -31,39 +33,33 @@ def check_security(path: str = ".", scanner: str = "bandit", args: str = "") ->
             raise ValueError(f"Unsupported security scanner: {scanner}. Use 'bandit', 'safety', or 'pip-audit'")
         
         # Execute security scan
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=120,
-            cwd=os.getcwd()
-        )
+        returncode, stdout, stderr = run_process(cmd, timeout=120)
         
         # Format output
         output = []
         output.append(f"🔒 Running {scanner} security scan on {path}")
-        output.append(f"📊 Exit Code: {result.returncode}")
+        output.append(f"📊 Exit Code: {returncode}")
         
-        if result.stdout:
-            output.append(f"\n📤 STDOUT:\n{result.stdout}")
+        if stdout:
+            output.append(f"\n📤 STDOUT:\n{stdout}")
         
-        if result.stderr:
-            output.append(f"\n⚠️  STDERR:\n{result.stderr}")
+        if stderr:
+            output.append(f"\n⚠️  STDERR:\n{stderr}")
         
         # Interpret results
-        if result.returncode == 0:
+        if returncode == 0:
             output.append(f"\n✅ Security scan passed - no issues found")
-        elif result.returncode == 1:
+        elif returncode == 1:
             output.append(f"\n⚠️  Security scan found issues")
-        elif result.returncode == 2:
+        elif returncode == 2:
             output.append(f"\n❌ Security scan failed to execute")
         else:
-            output.append(f"\n❓ Unexpected exit code: {result.returncode}")
+            output.append(f"\n❓ Unexpected exit code: {returncode}")
         
         return "\n".join(output)
         
-    except subprocess.TimeoutExpired:
-        raise Exception(f"Security scan timed out after 120 seconds")
+    except subprocess.TimeoutExpired as e:
+        raise Exception(timeout_message(f"Security scan timed out after 120 seconds", e))
     except Exception as e:
         raise Exception(f"Error running security scan: {str(e)}")
 
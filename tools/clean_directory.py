@@ -1,6 +1,8 @@
 import os
 import shutil
 
+from .walker import DEPENDENCY_DIRS, VCS_DIRS, walk
+
 def clean_directory(path: str, force: bool = False, remove_empty: bool = True, remove_temp: bool = True) -> str:
     """Clean a directory by removing temporary files and empty directories. Requires force=True for confirmation."""
     try:
@@ -26,12 +28,14 @@ def clean_directory(path: str, force: bool = False, remove_empty: bool = True, r
         removed_files = []
         removed_dirs = []
         
-        # Walk through directory
-        for root, dirs, files in os.walk(path, topdown=False):
+        # Walk through directory bottom-up, never descending into VCS metadata or dependency trees
+        for root, dirs, files in walk(path, topdown=False, use_ignore_files=False,
+                                      pruned_dirs=VCS_DIRS | DEPENDENCY_DIRS):
             # Remove temporary files
             if remove_temp:
-                for file in files:
-                    file_path = os.path.join(root, file)
+                for entry in files:
+                    file = entry.name
+                    file_path = entry.path
                     is_temp = False
                     
                     # Check if file matches temp patterns
@@ -61,8 +65,8 @@ def clean_directory(path: str, force: bool = False, remove_empty: bool = True, r
             
             # Remove empty directories
             if remove_empty:
-                for dir_name in dirs:
-                    dir_path = os.path.join(root, dir_name)
+                for dir_entry in dirs:
+                    dir_path = dir_entry.path
                     try:
                         if not os.listdir(dir_path):  # Directory is empty
                             os.rmdir(dir_path)
@@ -125,5 +129,6 @@ CLEAN_DIRECTORY_DEFINITION = {
         "required": ["path", "force"],
         "additionalProperties": False
     },
-    "tool_function": clean_directory
+    "tool_function": clean_directory,
+    "path_arguments": ["path"]
 } 
\ No newline at end of file
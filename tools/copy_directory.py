@@ -1,7 +1,10 @@
 import os
 import shutil
 
-def copy_directory(source_path: str, destination_path: str, force: bool = False, recursive: bool = True) -> str:
+from .walker import IgnoreFilter
+
+def copy_directory(source_path: str, destination_path: str, force: bool = False, recursive: bool = True,
+                   skip_ignored: bool = False) -> str:
     """Copy a directory. Requires force=True for confirmation. If recursive=True, copies contents too."""
     try:
         # Validate parameters
@@ -34,6 +37,10 @@ def copy_directory(source_path: str, destination_path: str, force: bool = False,
         
         # Copy the directory
         if recursive:
+            if skip_ignored:
+                # Ignored directories are never descended into, so node_modules and the like cost nothing
+                shutil.copytree(source_path, destination_path, ignore=IgnoreFilter(source_path))
+                return f"Successfully copied directory '{source_path}' to '{destination_path}' ({item_count} items, skipping ignored files)"
             shutil.copytree(source_path, destination_path)
             return f"Successfully copied directory '{source_path}' to '{destination_path}' ({item_count} items)"
         else:
@@ -68,10 +75,16 @@ COPY_DIRECTORY_DEFINITION = {
                 "type": "boolean",
                 "description": "Whether to copy directory contents as well. Defaults to True.",
                 "default": True
+            },
+            "skip_ignored": {
+                "type": "boolean",
+                "description": "Leave out files excluded by .gitignore/.ignore rules and .git, node_modules, virtualenv and cache directories. Defaults to False.",
+                "default": False
             }
         },
         "required": ["source_path", "destination_path", "force"],
         "additionalProperties": False
     },
-    "tool_function": copy_directory
+    "tool_function": copy_directory,
+    "path_arguments": ["source_path", "destination_path"]
 } 
\ No newline at end of file
@@ -45,5 +45,6 @@ CREATE_DIRECTORY_DEFINITION = {
         "required": ["path"],
         "additionalProperties": False
     },
-    "tool_function": create_directory
+    "tool_function": create_directory,
+    "path_arguments": ["path"]
 } 
\ No newline at end of file
@@ -1,5 +1,7 @@
 import os
 
+from . import file_cache
+
 def create_file(path: str, content: str = "", overwrite: bool = False) -> str:
     """Create a new file with specified content. If the file already exists, it will only be overwritten if overwrite is True."""
     try:
@@ -15,6 +17,7 @@ def create_file(path: str, content: str = "", overwrite: bool = False) -> str:
         # Create the file with content
         with open(path, 'w', encoding='utf-8') as file:
             file.write(content)
+        file_cache.invalidate(path)
         
         if os.path.exists(path) and not overwrite:
             return f"Created new file '{path}' with {len(content)} characters"
@@ -49,5 +52,6 @@ CREATE_FILE_DEFINITION = {
         "required": ["path"],
         "additionalProperties": False
     },
-    "tool_function": create_file
+    "tool_function": create_file,
+    "path_arguments": ["path"]
 } 
\ No newline at end of file
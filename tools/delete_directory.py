@@ -63,5 +63,6 @@ DELETE_DIRECTORY_DEFINITION = {
         "required": ["path", "force"],
         "additionalProperties": False
     },
-    "tool_function": delete_directory
+    "tool_function": delete_directory,
+    "path_arguments": ["path"]
 } 
\ No newline at end of file
@@ -46,5 +46,6 @@ DELETE_FILE_DEFINITION = {
         "required": ["path", "force"],
         "additionalProperties": False
     },
-    "tool_function": delete_file
+    "tool_function": delete_file,
+    "path_arguments": ["path"]
 } 
\ No newline at end of file
@@ -1,8 +1,22 @@
 import os
+import re
+import shutil
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
-def edit_file(path: str, old_str: str, new_str: str) -> str:
-    """Replace 'old_str' with 'new_str' in the given file. If the file doesn't exist, it will be created."""
+from . import file_cache
+
+def edit_file(path: Optional[str] = None, old_str: Optional[str] = None, new_str: Optional[str] = None,
+              edits: Optional[List[Dict[str, Any]]] = None, diff: Optional[str] = None) -> str:
+    """Replace 'old_str' with 'new_str' in the given file, apply a batch of edits to one or more files atomically, or apply a unified diff."""
     try:
+        if edits is not None and diff is not None:
+            raise ValueError("Pass either edits or diff, not both")
+        if edits is not None:
+            return _edit_batch(path, edits)
+        if diff is not None:
+            return _apply_diff(path, diff)
+        
         # Validate required parameters
         if path is None or path == "":
             raise ValueError("path parameter is required")
@@ -31,30 +45,355 @@ def edit_file(path: str, old_str: str, new_str: str) -> str:
             new_content = content.replace(old_str, new_str)
             
             # Write the updated content back to the file
-            with open(path, 'w', encoding='utf-8') as file:
-                file.write(new_content)
+            _commit([(path, _stage(path, new_content))])
             
             return f"Successfully replaced '{old_str}' with '{new_str}' in file '{path}'"
         else:
             # Create new file with new_str as content
-            with open(path, 'w', encoding='utf-8') as file:
-                file.write(new_str)
+            _commit([(path, _stage(path, new_str))])
             
             return f"Created new file '{path}' with content '{new_str}'"
             
     except Exception as e:
+        if edits is not None:
+            raise Exception(f"Error applying edits (no files were changed): {str(e)}")
         raise Exception(f"Error editing file {path}: {str(e)}")
 
+def _edit_batch(default_path: Optional[str], edits: List[Dict[str, Any]]) -> str:
+    """Apply edits in order, in memory, then write every touched file in one all-or-nothing commit."""
+    if not edits:
+        raise ValueError("edits must contain at least one edit")
+
+    # real path -> (path as first given, content, number of edits); files are read once however many
+    # edits they get, even when named differently ("d.txt", "./d.txt", or a symlink to it)
+    contents: Dict[str, Tuple[str, str, int]] = {}
+    created = set()
+    for number, edit in enumerate(edits, 1):
+        path = edit.get("path") or default_path
+        old = edit.get("old_str")
+        new = edit.get("new_str")
+        if not path:
+            raise ValueError(f"Edit {number} has no path")
+        if old is None or new is None:
+            raise ValueError(f"Edit {number} needs old_str and new_str")
+        if old == new:
+            raise ValueError(f"Edit {number}: old_str and new_str must be different from each other")
+
+        key = os.path.realpath(path)
+        if key not in contents:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as file:
+                    contents[key] = (path, file.read(), 0)
+            elif old == "":
+                # An empty old_str on a missing file creates it
+                contents[key] = (path, "", 0)
+                created.add(key)
+            else:
+                raise FileNotFoundError(f"Edit {number}: file '{path}' not found")
+        path, content, count = contents[key]
+
+        if old == "":
+            if content:
+                raise ValueError(f"Edit {number}: empty old_str is only allowed for new or empty files")
+            content = new
+        else:
+            occurrences = content.count(old)
+            if occurrences == 0:
+                raise ValueError(f"Edit {number}: string '{old}' not found in file '{path}'")
+            if occurrences > 1 and not edit.get("replace_all", False):
+                raise ValueError(f"Edit {number}: string '{old}' occurs {occurrences} times in '{path}'; "
+                                 "include more surrounding text to make it unique or set replace_all")
+            content = content.replace(old, new)
+        contents[key] = (path, content, count + 1)
+
+    # Nothing is written unless every edit applied; then each file is written exactly once
+    staged = []
+    try:
+        for path, content, _ in contents.values():
+            staged.append((path, _stage(path, content)))
+    except BaseException:
+        for _, temp_path in staged:
+            _remove_quietly(temp_path)
+        raise
+    _commit(staged)
+
+    result = [f"Applied {len(edits)} edits to {len(contents)} files:"]
+    for key, (path, _, count) in contents.items():
+        result.append(f"  - {path}: {count} edit{'s' if count != 1 else ''}{' (created)' if key in created else ''}")
+    return "\n".join(result)
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+# Context lines patch-style fuzz may drop from each end of a hunk that doesn't match as given
+_MAX_FUZZ = 2
+
+class _Hunk:
+    def __init__(self, number: int, old_start: int):
+        self.number: int = number
+        self.old_start: int = old_start
+        # (kind, text) with kind " ", "-" or "+"; text includes its newline
+        self.lines: List[Tuple[str, str]] = []
+
+def _apply_diff(path: Optional[str], diff: str) -> str:
+    """Apply a unified diff to one file, locating each hunk by line offset with fuzz, and stream the result to disk."""
+    if not path:
+        raise ValueError("path parameter is required with diff")
+    _, creates, hunks = _parse_diff(diff)
+    if not hunks:
+        raise ValueError("diff contains no hunks")
+
+    if creates and os.path.exists(path):
+        raise FileExistsError(f"The diff creates '{path}', but it already exists")
+    if not os.path.exists(path):
+        if not creates and any(kind != "+" for hunk in hunks for kind, _ in hunk.lines):
+            raise FileNotFoundError(f"File '{path}' not found")
+        lines: List[str] = []
+    else:
+        with open(path, 'r', encoding='utf-8') as file:
+            lines = file.readlines()
+
+    # Locate every hunk first, so nothing is written unless the whole diff applies
+    placements = []
+    position = 0
+    drift = 0
+    adjusted = 0
+    for hunk in hunks:
+        start, end, new_lines, fuzz = _locate(lines, hunk, position, hunk.old_start - 1 + drift)
+        if start != hunk.old_start - 1 + drift or fuzz:
+            adjusted += 1
+        drift = start - (hunk.old_start - 1)
+        placements.append((start, end, new_lines))
+        position = end
+
+    def patched():
+        copied = 0
+        for start, end, new_lines in placements:
+            yield from lines[copied:start]
+            yield from new_lines
+            copied = end
+        yield from lines[copied:]
+
+    _commit([(path, _stage(path, patched()))])
+    added = sum(kind == "+" for hunk in hunks for kind, _ in hunk.lines)
+    removed = sum(kind == "-" for hunk in hunks for kind, _ in hunk.lines)
+    note = f" ({adjusted} located at an offset or with fuzz)" if adjusted else ""
+    return f"Applied {len(hunks)} hunks to '{path}': +{added} -{removed} lines{note}"
+
+def _parse_diff(diff: str) -> Tuple[Optional[str], bool, List[_Hunk]]:
+    """Return (path from the +++ header, whether the diff creates the file, hunks)."""
+    path = None
+    creates = False
+    hunks: List[_Hunk] = []
+    hunk: Optional[_Hunk] = None
+    diff_lines = diff.splitlines(keepends=True)
+    for index, line in enumerate(diff_lines):
+        following = diff_lines[index + 1] if index + 1 < len(diff_lines) else ""
+        if line.startswith("--- ") and following.startswith("+++ "):
+            creates = _header_path(line) is None
+            continue
+        if line.startswith("+++ ") and index > 0 and diff_lines[index - 1].startswith("--- "):
+            new_path = _header_path(line)
+            if new_path is None:
+                raise ValueError("Deleting files with a diff is not supported; use delete_file")
+            if path is not None and new_path != path:
+                raise ValueError("The diff changes several files; apply one file per call or use edits")
+            path = new_path
+            hunk = None
+            continue
+
+        header = _HUNK_HEADER.match(line)
+        if header:
+            old_start = int(header.group(1))
+            if header.group(2) == "0":
+                # A hunk that only inserts ("-N,0", as diff -U0 writes) goes after line N, not at it
+                old_start += 1
+            hunk = _Hunk(len(hunks) + 1, max(old_start, 1))
+            hunks.append(hunk)
+        elif hunk is None:
+            # "diff --git", "index ..." and other preamble
+            continue
+        elif line.startswith("\\"):
+            # "\ No newline at end of file" applies to the line before it
+            if hunk.lines:
+                kind, text = hunk.lines[-1]
+                hunk.lines[-1] = (kind, text.rstrip("\r\n"))
+        elif line[:1] in (" ", "-", "+"):
+            text = line[1:]
+            hunk.lines.append((line[0], text if text.endswith("\n") else text + "\n"))
+        elif not line.strip():
+            # Editors and models often drop the space of an empty context line
+            hunk.lines.append((" ", "\n"))
+        else:
+            raise ValueError(f"Unexpected line in hunk {hunk.number}: {line.rstrip()!r}")
+    return path, creates, hunks
+
+def _header_path(line: str) -> Optional[str]:
+    name = line[4:].rstrip("\r\n").split("\t")[0].strip()
+    if name == "/dev/null":
+        return None
+    if name.startswith(("a/", "b/")):
+        name = name[2:]
+    return name
+
+def _locate(lines: List[str], hunk: _Hunk, earliest: int, expected: int) -> Tuple[int, int, List[str], int]:
+    """Find where hunk applies at or after earliest, nearest to expected first.
+
+    Tries the hunk as given, then ignoring trailing whitespace, then with up
+    to _MAX_FUZZ context lines dropped from each end. Returns (start, end,
+    replacement lines, fuzz used).
+    """
+    for fuzz in range(_MAX_FUZZ + 1):
+        leading = _context_run(hunk.lines, fuzz)
+        trailing = _context_run(list(reversed(hunk.lines)), fuzz)
+        if fuzz and not (leading or trailing):
+            break
+        trimmed = hunk.lines[leading:len(hunk.lines) - trailing]
+        old = [text for kind, text in trimmed if kind != "+"]
+        for loose in (False, True):
+            start = _find_block(lines, old, earliest, expected + leading, loose)
+            if start is not None:
+                # Context lines are kept as they are in the file, whitespace included
+                replacement = []
+                position = start
+                for kind, text in trimmed:
+                    if kind == " ":
+                        replacement.append(lines[position])
+                    elif kind == "+":
+                        replacement.append(text)
+                    if kind != "+":
+                        position += 1
+                return start, start + len(old), replacement, fuzz
+    raise ValueError(f"Hunk {hunk.number} (line {hunk.old_start}) does not match the file; "
+                     "re-read the file and regenerate the diff")
+
+def _context_run(lines: List[Tuple[str, str]], limit: int) -> int:
+    """Number of context lines (at most limit) at the start of lines."""
+    count = 0
+    while count < limit and count < len(lines) and lines[count][0] == " ":
+        count += 1
+    return count
+
+def _find_block(lines: List[str], block: List[str], earliest: int, expected: int, loose: bool) -> Optional[int]:
+    if not block:
+        # Pure insertion: trust the line number
+        return min(max(expected, earliest), len(lines))
+    if loose:
+        block = [line.rstrip() for line in block]
+    def matches(start: int) -> bool:
+        candidate = lines[start:start + len(block)]
+        if loose:
+            candidate = [line.rstrip() for line in candidate]
+        return candidate == block
+
+    last = len(lines) - len(block)
+    expected = min(max(expected, earliest), max(last, earliest))
+    # Search outward from where the hunk says it starts
+    for distance in range(max(expected - earliest, last - expected) + 1):
+        for start in (expected - distance, expected + distance):
+            if earliest <= start <= last and matches(start):
+                return start
+    return None
+
+def _stage(path: str, content: Union[str, Iterable[str]]) -> str:
+    """Write content (a string, or an iterable of chunks streamed to disk) to a temporary file next to path and return its name."""
+    # Through a symlink, the file it points to is what gets replaced
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            if isinstance(content, str):
+                file.write(content)
+            else:
+                file.writelines(content)
+            file.flush()
+            os.fsync(file.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        else:
+            # mkstemp creates files 0600; give new files the mode open() would
+            os.chmod(temp_path, 0o666 & ~_read_umask())
+    except BaseException:
+        _remove_quietly(temp_path)
+        raise
+    return temp_path
+
+# Where /proc can't tell, the umask as read the first time it was needed
+_fallback_umask: Optional[int] = None
+
+def _read_umask() -> int:
+    global _fallback_umask
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    if _fallback_umask is None:
+        # Otherwise the umask can only be read by setting it, which races with other threads creating
+        # files, so that is done just once
+        _fallback_umask = os.umask(0o022)
+        os.umask(_fallback_umask)
+    return _fallback_umask
+
+def _commit(staged: List[Tuple[str, str]]):
+    """Move staged temp files over their targets; if any move fails, put every target back as it was.
+
+    Each rename is atomic, so a crash never leaves a half-written file. The
+    originals are kept as hard links (or copies where links aren't
+    supported) until all renames succeed.
+    """
+    # (real path, backup); a symlink's target is replaced, not the link
+    backups: List[Tuple[str, Optional[str]]] = []
+    try:
+        for path, temp_path in staged:
+            target = os.path.realpath(path)
+            backup = None
+            if os.path.exists(target):
+                backup = f"{temp_path}.orig"
+                try:
+                    os.link(target, backup)
+                except OSError:
+                    shutil.copy2(target, backup)
+            backups.append((target, backup))
+            os.replace(temp_path, target)
+            file_cache.invalidate(path)
+            file_cache.invalidate(target)
+    except BaseException:
+        for target, backup in reversed(backups):
+            if backup is not None:
+                os.replace(backup, target)
+                # rename() is a no-op when both names are links to the same file, as when this target's own move failed
+                _remove_quietly(backup)
+            else:
+                _remove_quietly(target)
+            file_cache.invalidate(target)
+        for path, temp_path in staged:
+            file_cache.invalidate(path)
+            _remove_quietly(temp_path)
+        raise
+    for _, backup in backups:
+        if backup is not None:
+            _remove_quietly(backup)
+
+def _remove_quietly(path: str):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
 # Tool definition
 EDIT_FILE_DEFINITION = {
     "name": "edit_file",
-    "description": "Replace 'old_str' with 'new_str' in the given file. If the file doesn't exist, it will be created with 'new_str' as content. old_str and new_str must be different from each other.",
+    "description": "Replace 'old_str' with 'new_str' in the given file. If the file doesn't exist, it will be created with 'new_str' as content. old_str and new_str must be different from each other. To make several changes, pass 'edits' instead: they are applied in order, each old_str must match exactly once (unless replace_all is set), and all files are written atomically together, or not at all if any edit fails. For larger changes to one file, pass a unified 'diff' instead.",
     "input_schema": {
         "type": "object",
         "properties": {
             "path": {
                 "type": "string",
-                "description": "The path of the file to edit or create."
+                "description": "The path of the file to edit or create. With edits, the default path for edits that don't give one."
             },
             "old_str": {
                 "type": "string",
@@ -63,10 +402,43 @@ EDIT_FILE_DEFINITION = {
             "new_str": {
                 "type": "string",
                 "description": "The string to replace old_str with. Must be different from old_str."
+            },
+            "diff": {
+                "type": "string",
+                "description": "A unified diff (as from diff -u or git diff) for the file at path. Hunks are located by their line numbers, tolerating shifted lines, trailing whitespace and slightly stale context. Use it for large or multi-hunk changes."
+            },
+            "edits": {
+                "type": "array",
+                "description": "Ordered edits to apply as one transaction, possibly across several files.",
+                "minItems": 1,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "path": {
+                            "type": "string",
+                            "description": "The file to edit. Defaults to the top-level path."
+                        },
+                        "old_str": {
+                            "type": "string",
+                            "description": "Text to replace; must occur exactly once unless replace_all is set. Empty to create a new file."
+                        },
+                        "new_str": {
+                            "type": "string",
+                            "description": "Replacement text."
+                        },
+                        "replace_all": {
+                            "type": "boolean",
+                            "description": "Replace every occurrence of old_str. Defaults to False.",
+                            "default": False
+                        }
+                    },
+                    "required": ["old_str", "new_str"],
+                    "additionalProperties": False
+                }
             }
         },
-        "required": ["path", "old_str", "new_str"],
         "additionalProperties": False
     },
-    "tool_function": edit_file
-} 
\ No newline at end of file
+    "tool_function": edit_file,
+    "path_arguments": ["path", "edits"]
+}
@@ -0,0 +1,90 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Total size of cached file contents
+DEFAULT_BUDGET_BYTES = 64 * 1024 * 1024
+
+class FileCache:
+    """An in-process LRU cache of decoded file contents with a byte budget.
+
+    Entries are keyed by absolute path and validated on every lookup against
+    the file's mtime, size and inode, so a file changed by anything outside
+    the tools is re-read. Tools that write files call invalidate() as well,
+    which covers writes that land within the filesystem's mtime granularity.
+    """
+
+    def __init__(self, budget_bytes: int = DEFAULT_BUDGET_BYTES):
+        self.budget_bytes: int = budget_bytes
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int, int], str, int]]" = OrderedDict()
+        self._size: int = 0
+        self._lock = threading.Lock()
+
+    def read_text(self, path: str) -> str:
+        """Return the file's contents decoded as UTF-8, from the cache when the file is unchanged."""
+        key = os.path.abspath(path)
+        stat = os.stat(key)
+        version = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        with open(key, 'r', encoding='utf-8') as file:
+            content = file.read()
+        self._store(key, version, content, stat.st_size)
+        return content
+
+    def invalidate(self, path: str):
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self._entries), "bytes": self._size}
+
+    def _store(self, key: str, version: Tuple[int, int, int], content: str, size: int):
+        if size > self.budget_bytes // 4:
+            # One huge file would flush everything else
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[2]
+            self._entries[key] = (version, content, size)
+            self._size += size
+            while self._size > self.budget_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+_cache: Optional[FileCache] = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> FileCache:
+    """The cache shared by all tools in this process."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FileCache()
+        return _cache
+
+def invalidate(path: str):
+    get_cache().invalidate(path)
+
+def stats() -> Dict[str, int]:
+    return get_cache().stats()
@@ -129,5 +129,6 @@ GENERATE_CODE_DEFINITION = {
         "required": ["description"],
         "additionalProperties": False
     },
-    "tool_function": generate_code
+    "tool_function": generate_code,
+    "path_arguments": ["filename"]
 } 
\ No newline at end of file
@@ -1,10 +1,27 @@
+import codecs
+import hashlib
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import List, Optional, Tuple
 
-def get_file_info(path: str) -> str:
-    """Get detailed information about a file or directory."""
+from .walker import walk
+
+# Files are read in chunks of this size, so memory use doesn't grow with the file
+_CHUNK_BYTES = 1024 * 1024
+# Threads for batch lookups and for sizing subdirectories; the work is mostly waiting on stat calls
+_MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+def get_file_info(path: Optional[str] = None, paths: Optional[List[str]] = None,
+                  hash_algorithm: Optional[str] = None) -> str:
+    """Get detailed information about a file or directory, or about several paths at once."""
     try:
+        if paths is not None:
+            return _get_many(([path] if path else []) + list(paths), hash_algorithm)
+        if not path:
+            raise ValueError("path or paths is required")
+        
         # Check if path exists
         if not os.path.exists(path):
             raise FileNotFoundError(f"Path '{path}' not found")
@@ -18,11 +35,7 @@ def get_file_info(path: str) -> str:
         
         # Get file size
         size = stat.st_size
-        size_str = f"{size} bytes"
-        if size > 1024:
-            size_str = f"{size / 1024:.1f} KB"
-        if size > 1024 * 1024:
-            size_str = f"{size / (1024 * 1024):.1f} MB"
+        size_str = _format_size(size)
         
         # Get timestamps
         created_time = datetime.fromtimestamp(stat.st_ctime)
@@ -55,52 +68,150 @@ def get_file_info(path: str) -> str:
             if ext:
                 result.append(f"Extension: {ext}")
             
-            # Try to get line count for text files
+            # Count lines and characters in one streaming pass, hashing the same chunks if asked
             try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    result.append(f"Lines: {len(lines)}")
-                    
-                    # Count characters
-                    content = ''.join(lines)
-                    result.append(f"Characters: {len(content)}")
-                    
+                lines, characters, digest = _scan_file(path, hash_algorithm)
+                result.append(f"Lines: {lines}")
+                result.append(f"Characters: {characters}")
             except (UnicodeDecodeError, PermissionError):
                 result.append("Lines: Unable to read (binary file or permission denied)")
+                digest = None
+                if hash_algorithm:
+                    try:
+                        _, _, digest = _scan_file(path, hash_algorithm, count_text=False)
+                    except PermissionError:
+                        pass
+            if digest:
+                result.append(f"{hash_algorithm.upper()}: {digest}")
         
         # Additional info for directories
         elif is_dir:
-            try:
-                items = os.listdir(path)
-                files = [item for item in items if os.path.isfile(os.path.join(path, item))]
-                dirs = [item for item in items if os.path.isdir(os.path.join(path, item))]
-                
+            # One listing; the entry types come from the directory itself, without a stat per item
+            listing = next(walk(path, use_ignore_files=False, pruned_dirs=(), max_depth=0), None)
+            if listing is None:
+                result.append("Contents: Permission denied")
+            else:
+                _, dirs, files = listing
                 result.append(f"Files: {len(files)}")
                 result.append(f"Directories: {len(dirs)}")
-                result.append(f"Total items: {len(items)}")
+                result.append(f"Total items: {len(files) + len(dirs)}")
                 
-            except PermissionError:
-                result.append("Contents: Permission denied")
+                total_size, total_files, total_dirs = _directory_totals(files, dirs)
+                result.append(f"Total size (recursive): {_format_size(total_size)} "
+                              f"in {total_files} files and {total_dirs} directories")
         
         return "\n".join(result)
         
     except Exception as e:
         raise Exception(f"Error getting file info for {path}: {str(e)}")
 
+def _get_many(paths: List[str], hash_algorithm: Optional[str]) -> str:
+    """Info for each path, gathered concurrently; a failing path is reported in its place."""
+    if not paths:
+        raise ValueError("paths must not be empty")
+    
+    def one(path: str) -> str:
+        try:
+            return get_file_info(path, hash_algorithm=hash_algorithm)
+        except Exception as e:
+            return f"❌ {str(e)}"
+    
+    with ThreadPoolExecutor(max_workers=min(_MAX_WORKERS, len(paths))) as executor:
+        return "\n\n".join(executor.map(one, paths))
+
+def _scan_file(path: str, hash_algorithm: Optional[str], count_text: bool = True) -> Tuple[int, int, Optional[str]]:
+    """Return (lines, characters, hex digest or None), reading the file once in fixed-size chunks.
+
+    Raises UnicodeDecodeError if count_text is set and the file isn't UTF-8.
+    """
+    hasher = hashlib.new(hash_algorithm) if hash_algorithm else None
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    newlines = 0
+    characters = 0
+    last = b""
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(_CHUNK_BYTES)
+            if not chunk:
+                break
+            if hasher is not None:
+                hasher.update(chunk)
+            if count_text:
+                newlines += chunk.count(b'\n')
+                characters += len(decoder.decode(chunk))
+                last = chunk[-1:]
+    if count_text:
+        characters += len(decoder.decode(b"", final=True))
+    # A last line without a trailing newline still counts, as with readlines()
+    lines = newlines + (1 if last and last != b'\n' else 0)
+    return lines, characters, hasher.hexdigest() if hasher is not None else None
+
+def _directory_totals(files: List[os.DirEntry], dirs: List[os.DirEntry]) -> Tuple[int, int, int]:
+    """Return (bytes, files, directories) under a directory, sizing its subdirectories in parallel."""
+    size = sum(_entry_size(entry) for entry in files)
+    file_count = len(files)
+    dir_count = len(dirs)
+    subdirectories = [entry.path for entry in dirs if not entry.is_symlink()]
+    if subdirectories:
+        with ThreadPoolExecutor(max_workers=min(_MAX_WORKERS, len(subdirectories))) as executor:
+            for sub_size, sub_files, sub_dirs in executor.map(_tree_totals, subdirectories):
+                size += sub_size
+                file_count += sub_files
+                dir_count += sub_dirs
+    return size, file_count, dir_count
+
+def _tree_totals(directory: str) -> Tuple[int, int, int]:
+    size = 0
+    file_count = 0
+    dir_count = 0
+    for _, dirs, files in walk(directory, use_ignore_files=False, pruned_dirs=()):
+        dir_count += len(dirs)
+        file_count += len(files)
+        size += sum(_entry_size(entry) for entry in files)
+    return size, file_count, dir_count
+
+def _entry_size(entry: os.DirEntry) -> int:
+    try:
+        return entry.stat(follow_symlinks=False).st_size
+    except OSError:
+        return 0
+
+def _format_size(size: int) -> str:
+    size_str = f"{size} bytes"
+    if size > 1024:
+        size_str = f"{size / 1024:.1f} KB"
+    if size > 1024 * 1024:
+        size_str = f"{size / (1024 * 1024):.1f} MB"
+    if size > 1024 * 1024 * 1024:
+        size_str = f"{size / (1024 * 1024 * 1024):.1f} GB"
+    return size_str
+
 # Tool definition
 GET_FILE_INFO_DEFINITION = {
     "name": "get_file_info",
-    "description": "Get detailed information about a file or directory including size, timestamps, permissions, and more.",
+    "description": "Get detailed information about a file or directory including size, timestamps, permissions, and more. Directories include their recursive size and file count. Pass paths to get information about several files or directories in one call.",
     "input_schema": {
         "type": "object",
         "properties": {
             "path": {
                 "type": "string",
                 "description": "The path of the file or directory to get information about."
+            },
+            "paths": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Several paths to get information about in one call, instead of path."
+            },
+            "hash_algorithm": {
+                "type": "string",
+                "enum": ["md5", "sha1", "sha256", "sha512", "blake2b"],
+                "description": "Also compute a hash of each file's contents with this algorithm, e.g. to detect changes."
             }
         },
-        "required": ["path"],
+        "required": [],
         "additionalProperties": False
     },
-    "tool_function": get_file_info
+    "tool_function": get_file_info,
+    "read_only": True,
+    "path_arguments": ["path", "paths"]
 } 
\ No newline at end of file
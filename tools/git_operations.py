@@ -26,7 +26,7 @@ def git_operation(operation: str, args: str = "", message: str = "") -> str:
             if message:
                 cmd.extend(["-m", message])
             else:
-                cmd.append("-m", "Auto-commit by AI agent")
+                cmd.extend(["-m", "Auto-commit by AI agent"])
         elif operation == "diff":
             cmd.extend(["diff"])
             if args:
@@ -0,0 +1,246 @@
+import ast
+import hashlib
+import os
+import pickle
+import subprocess
+import tempfile
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .structured_results import CaseResult, file_for_module
+from .walker import iter_files
+
+# Changing one of these can change how every test runs
+CONFIG_FILES = frozenset({"pytest.ini", "setup.cfg", "tox.ini", "pyproject.toml"})
+# Directories searched for top-level packages, as a src layout puts them under src/
+_SOURCE_ROOTS = ("", "src/")
+
+# relpath -> (mtime_ns, size)
+Snapshot = Dict[str, Tuple[int, int]]
+
+def default_state_dir() -> str:
+    """Directory holding test run history; CODE_AGENT_TEST_STATE_DIR overrides ~/.cache/code-agent/test-runs."""
+    return os.environ.get("CODE_AGENT_TEST_STATE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "code-agent", "test-runs"
+    )
+
+def is_test_file(name: str, framework: str) -> bool:
+    """Whether a file name matches the framework's default test file pattern."""
+    if not name.endswith(".py"):
+        return False
+    if framework == "unittest":
+        return name.startswith("test")
+    return name.startswith("test_") or name.endswith("_test.py")
+
+def find_test_files(test_path: str, framework: str, root: str) -> List[str]:
+    """Relpaths (from root) of the test files under test_path, or test_path itself if it is a file."""
+    if os.path.isfile(test_path):
+        return [_relpath(test_path, root)]
+    return sorted(_relpath(entry.path, root) for entry in iter_files(test_path)
+                  if is_test_file(entry.name, framework))
+
+def failed_test_files(results: Iterable[CaseResult], test_files: Iterable[str]) -> Set[str]:
+    """Test files with a failing or erroring test."""
+    test_files = list(test_files)
+    failed = set()
+    for result in results:
+        if result.outcome in ("failed", "error"):
+            # A module that fails to import is reported under its own name, with no class
+            path, _ = file_for_module(result.classname or result.name, test_files)
+            if path is not None:
+                failed.add(path)
+    return failed
+
+def shard(test_files: List[str], count: int, snapshot: Snapshot, first: Set[str] = frozenset()) -> List[List[str]]:
+    """Split test files into at most count shards of similar total size, files in first leading each shard."""
+    shards: List[List[str]] = [[] for _ in range(max(1, min(count, len(test_files))))]
+    loads = [0] * len(shards)
+    # Largest first, each onto the lightest shard so far
+    for path in sorted(test_files, key=lambda path: -snapshot.get(path, (0, 0))[1]):
+        lightest = loads.index(min(loads))
+        shards[lightest].append(path)
+        loads[lightest] += snapshot.get(path, (0, 0))[1] or 1
+    return [sorted(files, key=lambda path: (path not in first, path)) for files in shards if files]
+
+class TestHistory:
+    """What run_tests knows about earlier runs under one root directory.
+
+    Holds a snapshot of the Python and config files' mtimes and sizes as of
+    the last run, so changes made since (by the tools or anything else) can be
+    found; the test files that failed in it; and the imports of every module,
+    reparsed only when a file changes. It is pickled to disk after each run.
+    """
+
+    VERSION = 1
+
+    def __init__(self, root: str, path: str):
+        self.root: str = root
+        self.path: str = path
+        self.snapshot: Optional[Snapshot] = None
+        self.failed: Set[str] = set()
+        # relpath -> (mtime_ns, size, imported module names)
+        self.imports: Dict[str, Tuple[int, int, Tuple[str, ...]]] = {}
+
+    @classmethod
+    def load(cls, root: str, state_dir: Optional[str] = None) -> "TestHistory":
+        root = os.path.abspath(root)
+        key = hashlib.sha1(root.encode("utf-8")).hexdigest()
+        path = os.path.join(state_dir or default_state_dir(), f"{key}.pickle")
+        try:
+            with open(path, "rb") as file:
+                history = pickle.load(file)
+            if isinstance(history, cls) and history.VERSION == cls.VERSION and history.root == root:
+                history.path = path
+                return history
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass
+        return cls(root, path)
+
+    def scan(self) -> Snapshot:
+        """Current mtimes and sizes of the Python and config files under the root."""
+        snapshot = {}
+        for entry in iter_files(self.root):
+            if entry.name.endswith(".py") or entry.name in CONFIG_FILES:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                snapshot[_relpath(entry.path, self.root)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changed_since_last_run(self, snapshot: Snapshot) -> Optional[Set[str]]:
+        """Files added, modified or removed since the last run; before any run, what git reports as changed.
+
+        Returns None when there is nothing to compare against.
+        """
+        if self.snapshot is None:
+            return _git_changes(self.root)
+        changed = {path for path, stamp in snapshot.items() if self.snapshot.get(path) != stamp}
+        changed.update(path for path in self.snapshot if path not in snapshot)
+        return changed
+
+    def affected_tests(self, changed: Set[str], test_files: List[str], snapshot: Snapshot) -> Set[str]:
+        """Test files that import a changed module, directly or through other modules."""
+        if any(os.path.basename(path) in CONFIG_FILES for path in changed):
+            return set(test_files)
+
+        modules: Dict[str, str] = {}
+        for path in set(snapshot) | changed:
+            for name in _module_names(path):
+                modules.setdefault(name, path)
+
+        importers: Dict[str, Set[str]] = {}
+        for path in snapshot:
+            if path.endswith(".py"):
+                # Test runners put a test's own directory on sys.path, so "import helpers" may mean a sibling
+                directory = os.path.dirname(path).replace("/", ".")
+                for name in self._imports_of(path, snapshot[path]):
+                    dependency = modules.get(name) or (modules.get(f"{directory}.{name}") if directory else None)
+                    if dependency is not None and dependency != path:
+                        importers.setdefault(dependency, set()).add(path)
+
+        reached = set(changed)
+        queue = deque(changed)
+        while queue:
+            for importer in importers.get(queue.popleft(), ()):
+                if importer not in reached:
+                    reached.add(importer)
+                    queue.append(importer)
+
+        affected = {path for path in test_files if path in reached}
+        # A conftest.py applies to every test beneath its directory
+        for path in changed:
+            if os.path.basename(path) == "conftest.py":
+                directory = os.path.dirname(path)
+                affected.update(test for test in test_files if not directory or test.startswith(directory + "/"))
+        return affected
+
+    def record(self, snapshot: Snapshot, ran: Iterable[str], failed: Set[str]):
+        """Remember a finished run: the files as they were when it started and which of its tests failed."""
+        self.snapshot = snapshot
+        self.failed = (self.failed - set(ran)) | failed
+        for path in [path for path in self.imports if path not in snapshot]:
+            del self.imports[path]
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _imports_of(self, path: str, stamp: Tuple[int, int]) -> Tuple[str, ...]:
+        cached = self.imports.get(path)
+        if cached is not None and cached[:2] == stamp:
+            return cached[2]
+        names = _parse_imports(os.path.join(self.root, path), path)
+        self.imports[path] = (stamp[0], stamp[1], names)
+        return names
+
+def _relpath(path: str, root: str) -> str:
+    return os.path.relpath(os.path.abspath(path), root).replace(os.sep, "/")
+
+def _module_names(path: str) -> List[str]:
+    """Dotted names a relpath can be imported as, from the root or a src/ directory."""
+    if not path.endswith(".py"):
+        return []
+    names = []
+    for prefix in _SOURCE_ROOTS:
+        if path.startswith(prefix):
+            name = path[len(prefix):-3].replace("/", ".")
+            if name.endswith(".__init__"):
+                name = name[:-len(".__init__")]
+            names.append(name)
+    return names
+
+def _parse_imports(filename: str, path: str) -> Tuple[str, ...]:
+    """Every module name the file may import, with each parent package, resolving relative imports."""
+    try:
+        with open(filename, "rb") as file:
+            tree = ast.parse(file.read(), filename)
+    except (OSError, SyntaxError, ValueError):
+        return ()
+
+    package = _module_names(path)[0].split(".")
+    if not path.endswith("__init__.py"):
+        package = package[:-1]
+
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            targets = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                if node.level - 1 > len(package):
+                    continue
+                base = package[:len(package) - node.level + 1]
+                module = ".".join(base + ([node.module] if node.module else []))
+            else:
+                module = node.module or ""
+            # "from package import name" may import a submodule
+            targets = [module] + [f"{module}.{alias.name}" if module else alias.name for alias in node.names]
+        else:
+            continue
+        for target in targets:
+            parts = target.split(".")
+            names.update(".".join(parts[:end]) for end in range(1, len(parts) + 1) if parts[0])
+    return tuple(sorted(names))
+
+def _git_changes(root: str) -> Optional[Set[str]]:
+    """Files modified against HEAD plus untracked ones, relative to root; None outside a git work tree."""
+    changed = set()
+    for cmd in (["git", "diff", "--name-only", "--relative", "HEAD"],
+                ["git", "ls-files", "--others", "--exclude-standard"]):
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30, cwd=root)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if result.returncode != 0:
+            return None
+        changed.update(line for line in result.stdout.splitlines() if line)
+    return changed
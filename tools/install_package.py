@@ -1,8 +1,9 @@
 import subprocess
 import sys
-import os
 from typing import Optional
 
+from .subprocess_runner import run_process, timeout_message
+
 def install_package(package: str, upgrade: bool = False, dev: bool = False, user: bool = False) -> str:
     """Install Python packages using pip."""
     try:
@@ -25,13 +26,7 @@ def install_package(package: str, upgrade: bool = False, dev: bool = False, user
         cmd.append(package)
         
         # Execute installation
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300,  # 5 minutes timeout for package installation
-            cwd=os.getcwd()
-        )
+        returncode, stdout, stderr = run_process(cmd, timeout=300)  # 5 minutes timeout for package installation
         
         # Format output
         output = []
@@ -39,26 +34,26 @@ def install_package(package: str, upgrade: bool = False, dev: bool = False, user
         output.append(f"🔧 Upgrade: {upgrade}")
         output.append(f"🔧 Dev mode: {dev}")
         output.append(f"🔧 User install: {user}")
-        output.append(f"📊 Exit Code: {result.returncode}")
+        output.append(f"📊 Exit Code: {returncode}")
         
-        if result.stdout:
-            output.append(f"\n📤 STDOUT:\n{result.stdout}")
+        if stdout:
+            output.append(f"\n📤 STDOUT:\n{stdout}")
         
-        if result.stderr:
-            output.append(f"\n⚠️  STDERR:\n{result.stderr}")
+        if stderr:
+            output.append(f"\n⚠️  STDERR:\n{stderr}")
         
         # Interpret results
-        if result.returncode == 0:
+        if returncode == 0:
             output.append(f"\n✅ Successfully installed {package}")
-        elif result.returncode == 1:
+        elif returncode == 1:
             output.append(f"\n❌ Failed to install {package}")
         else:
-            output.append(f"\n❓ Unexpected exit code: {result.returncode}")
+            output.append(f"\n❓ Unexpected exit code: {returncode}")
         
         return "\n".join(output)
         
-    except subprocess.TimeoutExpired:
-        raise Exception(f"Package installation timed out after 5 minutes")
+    except subprocess.TimeoutExpired as e:
+        raise Exception(timeout_message(f"Package installation timed out after 5 minutes", e))
     except Exception as e:
         raise Exception(f"Error installing package {package}: {str(e)}")
 
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from importlib import metadata
+from typing import Dict, Iterable, Optional, Tuple
+
+# Entries kept; the least recently used are dropped past this
+MAX_ENTRIES = 50_000
+
+# Files any of the linters read their settings from
+CONFIG_FILES = (".flake8", "setup.cfg", "tox.ini", "pyproject.toml", ".pylintrc", "pylintrc",
+                ".isort.cfg", ".editorconfig", ".pep8", ".pycodestyle")
+
+# (returncode, stdout, stderr) of linting one file, or a whole run for linters cached that way
+LintResult = Tuple[int, str, str]
+
+def default_cache_dir() -> str:
+    """Directory holding the lint cache; CODE_AGENT_LINT_CACHE_DIR overrides ~/.cache/code-agent/lint."""
+    return os.environ.get("CODE_AGENT_LINT_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "code-agent", "lint"
+    )
+
+def config_fingerprint(linter: str, args: str, fix: bool, directories: Iterable[str]) -> str:
+    """Hash of everything besides a file's content that decides how it lints.
+
+    That is the linter and its version, the Python version, the arguments,
+    and every linter config file in the given directories or their parents.
+    """
+    digest = hashlib.sha256()
+    try:
+        version = metadata.version(linter)
+    except metadata.PackageNotFoundError:
+        version = ""
+    digest.update(f"{linter}\0{version}\0{sys.version_info[:2]}\0{args}\0{fix}".encode("utf-8"))
+
+    seen = set()
+    for directory in directories:
+        current = os.path.abspath(directory)
+        while current not in seen:
+            seen.add(current)
+            for name in CONFIG_FILES:
+                path = os.path.join(current, name)
+                try:
+                    with open(path, "rb") as file:
+                        data = file.read()
+                except OSError:
+                    continue
+                digest.update(b"\0" + path.encode("utf-8") + b"\0" + hashlib.sha256(data).digest())
+            current = os.path.dirname(current)
+    return digest.hexdigest()
+
+# abspath -> ((mtime_ns, size, ino), sha256), so unchanged files aren't re-read just to hash them
+_hashes: Dict[str, Tuple[Tuple[int, int, int], str]] = {}
+_hashes_lock = threading.Lock()
+
+def content_hash(path: str) -> Optional[str]:
+    """SHA-256 of the file's contents, or None if it can't be read."""
+    key = os.path.abspath(path)
+    try:
+        stat = os.stat(key)
+    except OSError:
+        return None
+    version = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    with _hashes_lock:
+        cached = _hashes.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    try:
+        with open(key, "rb") as file:
+            digest = hashlib.sha256(file.read()).hexdigest()
+    except OSError:
+        return None
+    with _hashes_lock:
+        _hashes[key] = (version, digest)
+    return digest
+
+def entry_key(fingerprint: str, path: str, digest: str) -> str:
+    # The path is part of the key because linters print it in their output
+    return hashlib.sha256(f"{fingerprint}\0{path}\0{digest}".encode("utf-8")).hexdigest()
+
+class LintCache:
+    """Lint results by entry_key(), kept in memory and pickled to disk after each call that added any."""
+
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.entries: "OrderedDict[str, LintResult]" = OrderedDict()
+        self.dirty: bool = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, cache_dir: Optional[str] = None) -> "LintCache":
+        path = os.path.join(cache_dir or default_cache_dir(), "results.pickle")
+        cache = cls(path)
+        try:
+            with open(path, "rb") as file:
+                version, entries = pickle.load(file)
+            if version == cls.VERSION:
+                cache.entries = entries
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError, ValueError):
+            pass
+        return cache
+
+    def get(self, key: str) -> Optional[LintResult]:
+        with self._lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: LintResult):
+        with self._lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > MAX_ENTRIES:
+                self.entries.popitem(last=False)
+            self.dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return
+            data = pickle.dumps((self.VERSION, self.entries), protocol=pickle.HIGHEST_PROTOCOL)
+            self.dirty = False
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+_cache: Optional[LintCache] = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> LintCache:
+    """The cache shared by all lint_code calls in this process, loaded from disk on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LintCache.load()
+        return _cache
@@ -1,84 +1,399 @@
+import asyncio
+import contextlib
+import hashlib
+import importlib.util
+import io
+import math
 import subprocess
 import os
+import re
 import sys
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-def lint_code(path: str = ".", linter: str = "flake8", args: str = "", fix: bool = False) -> str:
-    """Run code linting and formatting tools."""
+from . import file_cache, lint_cache
+from .lint_cache import LintResult
+from .subprocess_runner import run_process, run_process_async, timeout_message
+from .walker import iter_files
+
+# Return codes of a run that went normally, issues or not; other runs are reported as they are and not cached
+_NORMAL_RETURNCODES = {"flake8": (0, 1), "black": (0, 1), "isort": (0, 1), "autopep8": (0, 2)}
+# pylint's "fatal message" and "usage error" bits
+_PYLINT_FAILED = 1 | 32
+# autopep8 prints a diff per file; the lines after each header belong to that file
+_DIFF_HEADERS = {"autopep8": "--- original/"}
+# Closing summaries that name no file; any other such line means the run as a whole went wrong
+_SUMMARY_LINES = {
+    "black": re.compile(r"All done!|Oh no!|No Python files are present to be formatted"
+                        r"|\d+ files? (?:would be |were )?(?:reformatted|left unchanged)"
+                        r"|\d+ files? (?:would fail|failed) to reformat"),
+    "isort": re.compile(r"Skipped \d+ files"),
+}
+# Linters with a Python API that lint_code can call directly
+_IN_PROCESS_LINTERS = ("isort", "autopep8")
+# Cache misses are split across processes, at least this many files to each
+_MIN_FILES_PER_PROCESS = 8
+# Up to this many misses, linters with an API run in this process instead of starting any
+_MAX_IN_PROCESS_FILES = 16
+
+def _build_command(path: str, linter: str, args: str, fix: bool, files: Optional[List[str]] = None,
+                   single_job: bool = False) -> List[str]:
+    """Validate the path and return the command that runs the linter, on just files if given."""
+    # Validate parameters
+    if not path:
+        raise ValueError("Path cannot be empty")
+    
+    # Check if path exists
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Path '{path}' not found")
+    
+    targets = files if files is not None else [path]
+    # Prepare command based on linter
+    if linter.lower() == "flake8":
+        cmd = [sys.executable, "-m", "flake8"] + targets
+        if single_job:
+            # Several of these run at once already; don't let each fork a worker per core too
+            cmd.append("--jobs=1")
+        if args:
+            cmd.extend(args.split())
+    elif linter.lower() == "pylint":
+        cmd = [sys.executable, "-m", "pylint", path]
+        if args:
+            cmd.extend(args.split())
+    elif linter.lower() == "black":
+        if files is not None and os.path.isdir(path):
+            # black only applies its excludes and .gitignore to files it finds walking a directory, so it
+            # walks path as usual and --include narrows that down to the files asked for
+            cmd = [sys.executable, "-m", "black", path, "--include", _black_include(path, files)]
+        else:
+            cmd = [sys.executable, "-m", "black"] + targets
+        if not fix:
+            cmd.append("--check")
+        if args:
+            cmd.extend(args.split())
+    elif linter.lower() == "isort":
+        cmd = [sys.executable, "-m", "isort"] + targets
+        if not fix:
+            cmd.append("--check-only")
+        if files is not None:
+            # Apply the skip settings to files named on the command line, as they would be to a directory's
+            cmd.append("--filter-files")
+        if args:
+            cmd.extend(args.split())
+    elif linter.lower() == "autopep8":
+        cmd = [sys.executable, "-m", "autopep8"] + targets
+        if files is None and os.path.isdir(path):
+            cmd.append("--recursive")
+        cmd.append("--in-place" if fix else "--diff")
+        if args:
+            cmd.extend(args.split())
+    else:
+        raise ValueError(f"Unsupported linter: {linter}. Use 'flake8', 'pylint', 'black', 'isort', or 'autopep8'")
+    return cmd
+
+def _black_include(path: str, files: List[str]) -> str:
+    """A regex matching just files under the directory path, as black names them (from its project root)."""
     try:
-        # Validate parameters
-        if not path:
-            raise ValueError("Path cannot be empty")
-        
-        # Check if path exists
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"Path '{path}' not found")
-        
-        # Prepare command based on linter
-        if linter.lower() == "flake8":
-            cmd = [sys.executable, "-m", "flake8", path]
-            if args:
-                cmd.extend(args.split())
-        elif linter.lower() == "pylint":
-            cmd = [sys.executable, "-m", "pylint", path]
-            if args:
-                cmd.extend(args.split())
-        elif linter.lower() == "black":
-            cmd = [sys.executable, "-m", "black", path]
-            if not fix:
-                cmd.append("--check")
-            if args:
-                cmd.extend(args.split())
-        elif linter.lower() == "isort":
-            cmd = [sys.executable, "-m", "isort", path]
-            if not fix:
-                cmd.append("--check-only")
-            if args:
-                cmd.extend(args.split())
-        elif linter.lower() == "autopep8":
-            cmd = [sys.executable, "-m", "autopep8", path]
-            if not fix:
-                cmd.append("--diff")
-            if args:
-                cmd.extend(args.split())
+        from black import find_project_root
+        root = find_project_root((path,))
+        # Older versions return just the root
+        root = root[0] if isinstance(root, tuple) else root
+    except ImportError:
+        root = None
+    base = Path(path).resolve()
+    # Without a project root black takes the directory itself as one
+    prefix = base.relative_to(root).as_posix() if root is not None else "."
+    names = []
+    for file in files:
+        relative = Path(os.path.relpath(os.path.abspath(file), os.path.abspath(path))).as_posix()
+        names.append("/" + relative if prefix == "." else f"/{prefix}/{relative}")
+    return "^(?:" + "|".join(re.escape(name) for name in names) + ")$"
+
+def _python_files(path: str) -> List[str]:
+    if os.path.isfile(path):
+        return [path]
+    return sorted(os.path.normpath(entry.path) for entry in iter_files(path) if entry.name.endswith(".py"))
+
+def _autopep8_excluded(path: str, args: str) -> Callable[[str], bool]:
+    """Whether "autopep8 --recursive path" would skip a file under the directory path, going by its exclude setting."""
+    try:
+        import autopep8
+        with contextlib.redirect_stderr(io.StringIO()):
+            exclude = autopep8.parse_args([path, "--recursive", "--diff"] + args.split(), apply_config=True).exclude
+    except (ImportError, SystemExit):
+        # The command line run reports a missing autopep8 or bad arguments
+        return lambda file: False
+
+    def excluded(file: str) -> bool:
+        # Named the way its own walk names them, each directory on the way down and then the file
+        parts = Path(os.path.relpath(file, path)).parts
+        return any(not autopep8.match_file(os.path.join(path, *parts[:end]), exclude)
+                   for end in range(1, len(parts) + 1))
+    return excluded
+
+def _plan(path: str, linter: str, args: str, fix: bool, use_cache: bool) -> Dict[str, Any]:
+    """Look up what the cache already knows and work out the commands for the rest."""
+    cmd = _build_command(path, linter, args, fix)
+    linter = linter.lower()
+    cache = lint_cache.get_cache()
+    directories = [os.getcwd(), path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path))]
+
+    if not use_cache or linter == "pylint":
+        # pylint checks modules against each other (duplicate code, import cycles), so only a whole run is cached
+        state = {"linter": linter, "per_file": False, "commands": [cmd], "key": None, "cached": None}
+        if use_cache and not fix:
+            digests = [(file, lint_cache.content_hash(file)) for file in _python_files(path)]
+            if all(digest is not None for _, digest in digests):
+                tree = hashlib.sha256("\0".join(f"{file}:{digest}" for file, digest in digests).encode("utf-8"))
+                fingerprint = lint_cache.config_fingerprint(linter, args, fix, directories)
+                state["key"] = lint_cache.entry_key(fingerprint, path, tree.hexdigest())
+                state["cached"] = cache.get(state["key"])
+                if state["cached"] is not None:
+                    state["commands"] = []
+        return state
+
+    files = _python_files(path)
+    if linter == "autopep8" and os.path.isdir(path):
+        # Files are passed to autopep8 one by one, which would bypass the exclusions of its own directory walk
+        excluded = _autopep8_excluded(path, args)
+        files = [file for file in files if not excluded(file)]
+    fingerprint = lint_cache.config_fingerprint(linter, args, fix, directories)
+    results: Dict[str, LintResult] = {}
+    # file -> (cache key, content hash), None for files that can't be hashed
+    keys: Dict[str, Optional[Tuple[str, str]]] = {}
+    misses = []
+    for file in files:
+        digest = lint_cache.content_hash(file)
+        keys[file] = None if digest is None else (lint_cache.entry_key(fingerprint, file, digest), digest)
+        cached = cache.get(keys[file][0]) if keys[file] is not None else None
+        if cached is not None:
+            results[file] = cached
         else:
-            raise ValueError(f"Unsupported linter: {linter}. Use 'flake8', 'pylint', 'black', 'isort', or 'autopep8'")
-        
-        # Execute linter
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=120,
-            cwd=os.getcwd()
-        )
-        
-        # Format output
-        output = []
-        output.append(f"🔍 Running {linter} on {path}")
-        output.append(f"🔧 Fix mode: {fix}")
-        output.append(f"📊 Exit Code: {result.returncode}")
-        
-        if result.stdout:
-            output.append(f"\n📤 STDOUT:\n{result.stdout}")
-        
-        if result.stderr:
-            output.append(f"\n⚠️  STDERR:\n{result.stderr}")
-        
-        # Interpret results
-        if result.returncode == 0:
-            output.append(f"\n✅ Code passed {linter} checks!")
-        elif result.returncode == 1:
-            output.append(f"\n⚠️  {linter} found issues")
-        elif result.returncode == 2:
-            output.append(f"\n❌ {linter} execution error")
+            misses.append(file)
+
+    in_process = (not args and len(misses) <= _MAX_IN_PROCESS_FILES and linter in _IN_PROCESS_LINTERS
+                  and importlib.util.find_spec(linter) is not None)
+    count = min(os.cpu_count() or 1, math.ceil(len(misses) / _MIN_FILES_PER_PROCESS))
+    chunks = [] if in_process else [misses[number::count] for number in range(count)]
+    commands = [_build_command(path, linter, args, fix, chunk, single_job=count > 1) for chunk in chunks]
+    return {"linter": linter, "per_file": True, "fix": fix, "files": files, "keys": keys, "results": results,
+            "misses": misses, "in_process": in_process, "chunks": chunks, "commands": commands}
+
+def _lint_in_process(linter: str, files: List[str], fix: bool) -> Dict[str, LintResult]:
+    """Lint files through the linter's API, with the same settings and output its command line would use."""
+    results = {}
+    if not files:
+        return results
+    if linter == "isort":
+        import isort
+        config = isort.Config(settings_path=os.getcwd())
+        for file in files:
+            absolute = Path(file).resolve()
+            if config.is_skipped(absolute):
+                results[file] = (0, "", "")
+                continue
+            source = _read_source(file)
+            if isort.code(source, config=config, file_path=absolute) == source:
+                results[file] = (0, "", "")
+            elif fix:
+                _write_source(file, isort.code(source, config=config, file_path=absolute))
+                results[file] = (0, f"Fixing {absolute}\n", "")
+            else:
+                results[file] = (1, "", f"ERROR: {absolute} Imports are incorrectly sorted and/or formatted.\n")
+    elif linter == "autopep8":
+        import autopep8
+        # Reads the config files the way "autopep8 --diff file ..." would
+        options = autopep8.parse_args(["--in-place" if fix else "--diff"] + files, apply_config=True)
+        for file in files:
+            source = _read_source(file)
+            fixed = autopep8.fix_code(source, options=options)
+            if fixed == source:
+                results[file] = (0, "", "")
+            elif fix:
+                _write_source(file, fixed)
+                results[file] = (0, "", "")
+            else:
+                diff = autopep8.get_diff_text(source.splitlines(True), fixed.splitlines(True), file)
+                results[file] = (2 if options.exit_code else 0, diff, "")
+    return results
+
+def _read_source(file: str) -> str:
+    # newline="" keeps the file's own line endings through a rewrite
+    with open(file, "r", encoding="utf-8", newline="") as handle:
+        return handle.read()
+
+def _write_source(file: str, source: str):
+    with open(file, "w", encoding="utf-8", newline="") as handle:
+        handle.write(source)
+    file_cache.invalidate(file)
+
+def _split_output(linter: str, files: List[str], returncode: int, stdout: str,
+                  stderr: str) -> Optional[Dict[str, LintResult]]:
+    """Attribute each line of a run over several files to the file it is about.
+
+    Blank lines and black's and isort's closing summaries are dropped; each
+    file gets the run's return code if it has any output. Returns None if
+    any other line is about no file (a missing linter, a broken config), or
+    the run failed without naming a file, as then no file's result is known.
+    """
+    aliases = {}
+    for file in files:
+        for alias in (file, os.path.normpath(file), os.path.abspath(file)):
+            aliases.setdefault(alias, file)
+    mention = re.compile(r"(?:^|[\s/])(" + "|".join(re.escape(alias) for alias in
+                                                   sorted(aliases, key=len, reverse=True)) + r")(?=[:\s]|$)")
+    header = _DIFF_HEADERS.get(linter)
+    summary = _SUMMARY_LINES.get(linter)
+
+    lines = {file: ([], []) for file in files}
+    for stream, text in enumerate((stdout, stderr)):
+        current = None
+        for line in text.splitlines(keepends=True):
+            if header is not None:
+                if line.startswith(header):
+                    current = aliases.get(line[len(header):].strip())
+            else:
+                match = mention.search(line)
+                current = aliases[match.group(1)] if match else None
+            if current is not None:
+                lines[current][stream].append(line)
+            elif line.strip() and not (summary is not None and summary.match(line)):
+                return None
+
+    if returncode and not any(out or err for out, err in lines.values()):
+        return None
+    results = {}
+    for file, (out, err) in lines.items():
+        results[file] = (returncode if (out or err) else 0, "".join(out), "".join(err))
+    return results
+
+def _finish(state: Dict[str, Any], outputs: Any) -> Tuple[int, str, str, List[str]]:
+    """Merge fresh and cached results into (returncode, stdout, stderr, notes) and update the cache."""
+    linter = state["linter"]
+    cache = lint_cache.get_cache()
+
+    if not state["per_file"]:
+        if state["cached"] is not None:
+            returncode, stdout, stderr = state["cached"]
+            notes = ["🗃️  No file changed since the last identical run; showing its result"]
         else:
-            output.append(f"\n❓ Unexpected exit code: {result.returncode}")
+            returncode, stdout, stderr = outputs[0]
+            notes = []
+            if state["key"] is not None and not returncode & _PYLINT_FAILED:
+                cache.put(state["key"], (returncode, stdout, stderr))
+        _save(cache)
+        return returncode, stdout, stderr, notes
+
+    results: Dict[str, LintResult] = dict(state["results"])
+    fresh: Dict[str, LintResult] = {}
+    failed_runs: List[LintResult] = []
+    if state["in_process"]:
+        fresh = outputs
+    else:
+        for chunk, (returncode, stdout, stderr) in zip(state["chunks"], outputs):
+            split = None
+            if returncode in _NORMAL_RETURNCODES.get(linter, (0,)):
+                split = _split_output(linter, chunk, returncode, stdout, stderr)
+            if split is not None:
+                fresh.update(split)
+            else:
+                # Shown as the linter printed it, and not cached
+                failed_runs.append((returncode, stdout, stderr))
+    for file, result in fresh.items():
+        results[file] = result
+        key = state["keys"].get(file)
+        # A file the fixer rewrote has new content; its next lint decides whether that is clean
+        if key is not None and (not state["fix"] or lint_cache.content_hash(file) == key[1]):
+            cache.put(key[0], result)
+    _save(cache)
+
+    ordered = [results[file] for file in state["files"] if file in results] + failed_runs
+    returncode = max((result[0] for result in ordered), default=0)
+    stdout = "".join(result[1] for result in ordered)
+    stderr = "".join(result[2] for result in ordered)
+
+    files, misses = len(state["files"]), len(state["misses"])
+    if not files:
+        notes = ["🗃️  No Python files to lint"]
+    elif not misses:
+        notes = [f"🗃️  All {files} files unchanged since last linted; showing earlier results"]
+    elif state["in_process"]:
+        notes = [f"🗃️  {files - misses} of {files} files unchanged since last linted; linted {misses} in-process"]
+    else:
+        processes = len(state["chunks"])
+        notes = [f"🗃️  {files - misses} of {files} files unchanged since last linted; linted {misses} "
+                 + ("in one process" if processes == 1 else f"in {processes} parallel processes")]
+    return returncode, stdout, stderr, notes
+
+def _save(cache: lint_cache.LintCache):
+    try:
+        cache.save()
+    except OSError:
+        pass
+
+def _format_result(path: str, linter: str, fix: bool, returncode: int, stdout: str, stderr: str,
+                   notes: List[str] = ()) -> str:
+    output = []
+    output.append(f"🔍 Running {linter} on {path}")
+    output.append(f"🔧 Fix mode: {fix}")
+    output.extend(notes)
+    output.append(f"📊 Exit Code: {returncode}")
+    
+    if stdout:
+        output.append(f"\n📤 STDOUT:\n{stdout}")
+    
+    if stderr:
+        output.append(f"\n⚠️  STDERR:\n{stderr}")
+    
+    # Interpret results
+    if returncode == 0:
+        output.append(f"\n✅ Code passed {linter} checks!")
+    elif returncode == 1:
+        output.append(f"\n⚠️  {linter} found issues")
+    elif returncode == 2:
+        output.append(f"\n❌ {linter} execution error")
+    else:
+        output.append(f"\n❓ Unexpected exit code: {returncode}")
+    
+    return "\n".join(output)
+
+def lint_code(path: str = ".", linter: str = "flake8", args: str = "", fix: bool = False, timeout: int = 120,
+              use_cache: bool = True) -> str:
+    """Run code linting and formatting tools, only on files that changed since they were last linted."""
+    try:
+        state = _plan(path, linter, args, fix, use_cache)
+
+        # Execute linter, in-process or one process per chunk of files
+        if state.get("in_process"):
+            outputs = _lint_in_process(state["linter"], state["misses"], fix)
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, len(state["commands"]))) as executor:
+                outputs = list(executor.map(lambda cmd: run_process(cmd, timeout=timeout), state["commands"]))
+        returncode, stdout, stderr, notes = _finish(state, outputs)
+        return _format_result(path, linter, fix, returncode, stdout, stderr, notes)
         
-        return "\n".join(output)
+    except subprocess.TimeoutExpired as e:
+        raise Exception(timeout_message(f"Linting timed out after {timeout} seconds", e))
+    except Exception as e:
+        raise Exception(f"Error running {linter}: {str(e)}")
+
+async def lint_code_async(path: str = ".", linter: str = "flake8", args: str = "", fix: bool = False,
+                          timeout: int = 120, use_cache: bool = True) -> str:
+    """Async version of lint_code that runs the linter as an asyncio subprocess."""
+    try:
+        # Hashing files and in-process linting are blocking work; keep them off the event loop
+        state = await asyncio.to_thread(_plan, path, linter, args, fix, use_cache)
+        if state.get("in_process"):
+            outputs = await asyncio.to_thread(_lint_in_process, state["linter"], state["misses"], fix)
+        else:
+            outputs = list(await asyncio.gather(*(run_process_async(cmd, timeout=timeout)
+                                                  for cmd in state["commands"])))
+        returncode, stdout, stderr, notes = await asyncio.to_thread(_finish, state, outputs)
+        return _format_result(path, linter, fix, returncode, stdout, stderr, notes)
         
-    except subprocess.TimeoutExpired:
-        raise Exception(f"Linting timed out after 120 seconds")
+    except subprocess.TimeoutExpired as e:
+        raise Exception(timeout_message(f"Linting timed out after {timeout} seconds", e))
     except Exception as e:
         raise Exception(f"Error running {linter}: {str(e)}")
 
@@ -108,10 +423,22 @@ LINT_CODE_DEFINITION = {
                 "type": "boolean",
                 "description": "Whether to fix issues automatically (for formatters). Defaults to False.",
                 "default": False
+            },
+            "timeout": {
+                "type": "integer",
+                "description": "Timeout in seconds for each linter process. Defaults to 120.",
+                "default": 120,
+                "minimum": 1
+            },
+            "use_cache": {
+                "type": "boolean",
+                "description": "Reuse earlier results for files whose content and linter config haven't changed. Defaults to True.",
+                "default": True
             }
         },
         "required": [],
         "additionalProperties": False
     },
-    "tool_function": lint_code
+    "tool_function": lint_code,
+    "async_tool_function": lint_code_async
 } 
\ No newline at end of file
@@ -1,8 +1,23 @@
 import os
-import json
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import List, Optional, Tuple
 
-def list_directory(path: str = ".") -> str:
-    """List the contents of a directory at the given path."""
+from .walker import IgnoreFilter
+
+# Listings kept for directories whose mtime hasn't changed
+_CACHE_SIZE = 4096
+
+# (name, is_dir) pairs, directories first, each group sorted by name
+_Listing = List[Tuple[str, bool]]
+
+_listings: "OrderedDict[str, Tuple[Tuple[int, int], _Listing]]" = OrderedDict()
+_listings_lock = threading.Lock()
+
+def list_directory(path: str = ".", recursive: bool = False, max_depth: int = 3, max_entries: int = 500,
+                   show_details: bool = False, include_ignored: bool = False) -> str:
+    """List the contents of a directory at the given path, optionally as a recursive tree."""
     try:
         # Ensure the path exists
         if not os.path.exists(path):
@@ -12,23 +27,18 @@ def list_directory(path: str = ".") -> str:
         if not os.path.isdir(path):
             raise ValueError(f"Path is not a directory: {path}")
         
+        if recursive:
+            return _list_tree(path, max_depth, max_entries, show_details, include_ignored)
+        
         # Get directory contents
-        items = os.listdir(path)
+        if show_details:
+            listing = [(name, is_dir, details) for name, is_dir, details in _scan_with_details(path)]
+        else:
+            listing = [(name, is_dir, None) for name, is_dir in _cached_listing(path)]
         
         # Separate files and directories
-        files = []
-        directories = []
-        
-        for item in items:
-            item_path = os.path.join(path, item)
-            if os.path.isdir(item_path):
-                directories.append(item + "/")
-            else:
-                files.append(item)
-        
-        # Sort both lists
-        directories.sort()
-        files.sort()
+        directories = [_label(name, is_dir, details) for name, is_dir, details in listing if is_dir]
+        files = [_label(name, is_dir, details) for name, is_dir, details in listing if not is_dir]
         
         # Build the result
         result = []
@@ -52,10 +62,137 @@ def list_directory(path: str = ".") -> str:
     except Exception as e:
         raise Exception(f"Error listing directory {path}: {str(e)}")
 
+def _list_tree(path: str, max_depth: int, max_entries: int, show_details: bool, include_ignored: bool) -> str:
+    """Render the tree under path, indented two spaces per level.
+
+    Directories are expanded breadth-first until max_entries entries are
+    collected, so a large first subdirectory can't crowd out the rest of the
+    top levels; the result is then printed as a depth-first tree.
+    """
+    if include_ignored:
+        ignore = IgnoreFilter(path, use_ignore_files=False, pruned_dirs=())
+    else:
+        ignore = IgnoreFilter(path)
+
+    # directory -> [(child path, name, is_dir, details)], or None if it could not be read
+    expanded = {}
+    # directory -> children left out to stay within max_entries
+    hidden = {}
+    count = 0
+    queue = deque([(path, 1)])
+    while queue and count < max_entries:
+        directory, depth = queue.popleft()
+        try:
+            if show_details:
+                listing = _scan_with_details(directory)
+            else:
+                listing = [(name, is_dir, None) for name, is_dir in _cached_listing(directory)]
+        except OSError:
+            expanded[directory] = None
+            continue
+        rules = ignore.rules_for(directory, [name for name, _, _ in listing])
+        children = []
+        for name, is_dir, details in listing:
+            child = os.path.join(directory, name)
+            if ignore.is_ignored(rules, child, is_dir):
+                continue
+            children.append((child, name, is_dir, details))
+            if is_dir and depth < max_depth and not os.path.islink(child):
+                queue.append((child, depth + 1))
+        expanded[directory] = children[:max_entries - count]
+        hidden[directory] = len(children) - len(expanded[directory])
+        count += len(expanded[directory])
+
+    result = [os.path.join(path, "")]
+    def render(directory: str, depth: int):
+        children = expanded[directory]
+        if children is None:
+            result.append(f"{'  ' * depth}(permission denied)")
+            return
+        for child, name, is_dir, details in children:
+            label = _label(name, is_dir, details)
+            if child in expanded:
+                result.append(f"{'  ' * depth}{label}")
+                render(child, depth + 1)
+            else:
+                result.append(f"{'  ' * depth}{label}{' …' if is_dir else ''}")
+        if hidden.get(directory):
+            result.append(f"{'  ' * depth}... {hidden[directory]} more entries")
+    render(path, 1)
+
+    if queue or any(hidden.values()):
+        result.append(f"(Stopped at {max_entries} entries; directories marked '…' were not expanded. "
+                      "List a subdirectory or raise max_entries to see more.)")
+    return "\n".join(result)
+
+def _cached_listing(directory: str) -> _Listing:
+    """Names and types of a directory's entries, reused while the directory's mtime is unchanged.
+
+    Adding, removing or renaming an entry updates the directory's mtime, so
+    a cached listing is never missing an entry; file contents aren't part of
+    it, so edits don't invalidate anything.
+    """
+    key = os.path.abspath(directory)
+    stat = os.stat(key)
+    version = (stat.st_mtime_ns, stat.st_ino)
+    with _listings_lock:
+        cached = _listings.get(key)
+        if cached is not None and cached[0] == version:
+            _listings.move_to_end(key)
+            return cached[1]
+
+    entries = []
+    with os.scandir(key) as iterator:
+        for entry in iterator:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            entries.append((entry.name, is_dir))
+    listing = _sorted(entries)
+    with _listings_lock:
+        _listings[key] = (version, listing)
+        while len(_listings) > _CACHE_SIZE:
+            _listings.popitem(last=False)
+    return listing
+
+def _scan_with_details(directory: str) -> List[Tuple[str, bool, Optional[os.stat_result]]]:
+    """Entries with their stat results, always read fresh since file sizes and times change without the directory's mtime."""
+    entries = []
+    with os.scandir(directory) as iterator:
+        for entry in iterator:
+            try:
+                is_dir = entry.is_dir()
+                stat = entry.stat()
+            except OSError:
+                is_dir, stat = False, None
+            entries.append((entry.name, is_dir, stat))
+    return _sorted(entries)
+
+def _sorted(entries):
+    # Directories first, then files, each sorted by name
+    return sorted(entries, key=lambda entry: (not entry[1], entry[0]))
+
+def _label(name: str, is_dir: bool, stat: Optional[os.stat_result]) -> str:
+    label = name + "/" if is_dir else name
+    if stat is None:
+        return label
+    modified = datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M')
+    if is_dir:
+        return f"{label} (modified {modified})"
+    return f"{label} ({_format_size(stat.st_size)}, modified {modified})"
+
+def _format_size(size: int) -> str:
+    if size > 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} MB"
+    if size > 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size} bytes"
+
 # Tool definition
 LIST_DIRECTORY_DEFINITION = {
     "name": "list_directory",
-    "description": "List the contents of a directory at the given path. Use this when you want to see what files and folders are in a directory.",
+    "description": "List the contents of a directory at the given path. Use this when you want to see what files and folders are in a directory. Set recursive=True to get an indented tree of the whole directory in one call (skipping .git, node_modules, virtualenvs, caches and ignored files), limited by max_depth and max_entries.",
     "input_schema": {
         "type": "object",
         "properties": {
@@ -63,10 +200,39 @@ LIST_DIRECTORY_DEFINITION = {
                 "type": "string",
                 "description": "The path to the directory to list. Defaults to current directory ('.') if not specified.",
                 "default": "."
+            },
+            "recursive": {
+                "type": "boolean",
+                "description": "List subdirectories too, as an indented tree. Defaults to False.",
+                "default": False
+            },
+            "max_depth": {
+                "type": "integer",
+                "description": "With recursive, how many levels to expand; deeper directories are marked with '…'. Defaults to 3.",
+                "default": 3,
+                "minimum": 1
+            },
+            "max_entries": {
+                "type": "integer",
+                "description": "With recursive, the most entries to show before stopping. Defaults to 500.",
+                "default": 500,
+                "minimum": 1
+            },
+            "show_details": {
+                "type": "boolean",
+                "description": "Show each entry's size and modification time. Defaults to False.",
+                "default": False
+            },
+            "include_ignored": {
+                "type": "boolean",
+                "description": "With recursive, also descend into ignored files and VCS, dependency and cache directories. Defaults to False.",
+                "default": False
             }
         },
         "required": [],
         "additionalProperties": False
     },
-    "tool_function": list_directory
-} 
\ No newline at end of file
+    "tool_function": list_directory,
+    "read_only": True,
+    "path_arguments": ["path"]
+}
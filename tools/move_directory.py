@@ -64,5 +64,6 @@ MOVE_DIRECTORY_DEFINITION = {
         "required": ["source_path", "destination_path", "force"],
         "additionalProperties": False
     },
-    "tool_function": move_directory
+    "tool_function": move_directory,
+    "path_arguments": ["source_path", "destination_path"]
 } 
\ No newline at end of file
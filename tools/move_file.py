@@ -60,5 +60,6 @@ MOVE_FILE_DEFINITION = {
         "required": ["source_path", "destination_path", "force"],
         "additionalProperties": False
     },
-    "tool_function": move_file
+    "tool_function": move_file,
+    "path_arguments": ["source_path", "destination_path"]
 } 
\ No newline at end of file
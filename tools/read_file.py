@@ -1,31 +1,174 @@
-import json
-
-def read_file(path: str) -> str:
-    """Read the contents of a given relative file path."""
-    try:        
-        with open(path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        return content
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .file_cache import get_cache
+
+# Files up to this size are returned whole when no range is given
+MAX_UNRANGED_BYTES = 256 * 1024
+# Lines returned from a larger file when no range is given
+DEFAULT_LINE_LIMIT = 2000
+# Upper bound on the text returned by a single call
+MAX_OUTPUT_BYTES = 256 * 1024
+
+# The line index records how many newlines precede each chunk of this many bytes
+_CHUNK_BYTES = 64 * 1024
+_INDEX_CACHE_SIZE = 32
+
+_indexes: "OrderedDict[Tuple[str, int, int, int], array]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def read_file(path: str, offset: Optional[int] = None, limit: Optional[int] = None,
+              byte_offset: Optional[int] = None, byte_limit: Optional[int] = None) -> str:
+    """Read the contents of a given relative file path, optionally just a range of lines or bytes."""
+    try:
+        if (offset is not None or limit is not None) and (byte_offset is not None or byte_limit is not None):
+            raise ValueError("Use either offset/limit (lines) or byte_offset/byte_limit, not both")
+        if any(value is not None and value < 0 for value in (offset, limit, byte_offset, byte_limit)):
+            raise ValueError("offset, limit, byte_offset and byte_limit must not be negative")
+
+        ranged = any(value is not None for value in (offset, limit, byte_offset, byte_limit))
+        if not ranged and os.path.getsize(path) <= MAX_UNRANGED_BYTES:
+            # Whole small files come from the shared content cache while they are unchanged
+            content = get_cache().read_text(path)
+
+            return content
+
+        with open(path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            if stat.st_size == 0:
+                return "[File is empty]"
+            # The file is mapped, not read: only the requested range is ever copied or decoded
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if byte_offset is not None or byte_limit is not None:
+                    return _read_bytes(data, byte_offset or 0, byte_limit)
+                index = _line_index(path, stat, data)
+                return _read_lines(data, index, offset or 1, limit if limit is not None else DEFAULT_LINE_LIMIT)
     except FileNotFoundError:
         raise FileNotFoundError(f"File not found: {path}")
     except Exception as e:
         raise Exception(f"Error reading file: {str(e)}")
 
+def _read_bytes(data: mmap.mmap, start: int, length: Optional[int]) -> str:
+    size = len(data)
+    if start >= size:
+        return f"[byte_offset {start} is past the end of the file ({size} bytes)]"
+    end = size if length is None else min(size, start + length)
+    end = min(end, start + MAX_OUTPUT_BYTES)
+    text = data[start:end].decode('utf-8', errors='replace')
+    return f"{text}\n\n[Showing bytes {start}-{end} of {size}.{_continue_hint(end < size, f'byte_offset={end}')}]"
+
+def _read_lines(data: mmap.mmap, index: array, first: int, limit: int) -> str:
+    total_lines = _total_lines(data, index)
+    first = max(first, 1)
+    if first > total_lines:
+        return f"[offset {first} is past the end of the file ({total_lines} lines)]"
+
+    start = _line_start(data, index, first)
+    last = min(total_lines, first + limit - 1) if limit else total_lines
+    end = _line_start(data, index, last + 1) if last < total_lines else len(data)
+    if end - start > MAX_OUTPUT_BYTES:
+        # Cut at the last whole line that fits; a single huge line is cut mid-line
+        cut = data.rfind(b'\n', start, start + MAX_OUTPUT_BYTES)
+        if cut == -1:
+            end = start + MAX_OUTPUT_BYTES
+            last = first
+        else:
+            end = cut + 1
+            last = first + data[start:end].count(b'\n') - 1
+
+    text = data[start:end].decode('utf-8', errors='replace').replace('\r\n', '\n')
+    if text.endswith('\n'):
+        text = text[:-1]
+    more = _continue_hint(last < total_lines, f"offset={last + 1}")
+    return f"{text}\n\n[Showing lines {first}-{last} of {total_lines}.{more}]"
+
+def _continue_hint(more: bool, argument: str) -> str:
+    return f" Use {argument} to read more." if more else ""
+
+def _line_index(path: str, stat: os.stat_result, data: mmap.mmap) -> array:
+    """Return the number of newlines before each _CHUNK_BYTES chunk of the file (plus the total).
+
+    Built with one pass of C-level counting and kept for the most recently
+    read files, so paging through a large file only scans it once.
+    """
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+
+    index = array('Q', [0])
+    newlines = 0
+    for position in range(0, len(data), _CHUNK_BYTES):
+        newlines += data[position:position + _CHUNK_BYTES].count(b'\n')
+        index.append(newlines)
+
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > _INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+def _total_lines(data: mmap.mmap, index: array) -> int:
+    # A final line without a trailing newline still counts
+    return index[-1] + (0 if data[-1:] == b'\n' else 1)
+
+def _line_start(data: mmap.mmap, index: array, line: int) -> int:
+    """Byte offset where 1-based line number line starts."""
+    if line <= 1:
+        return 0
+    wanted = line - 1
+    # The chunk holding the wanted-th newline: the first whose end count reaches it
+    chunk = bisect_left(index, wanted) - 1
+    position = chunk * _CHUNK_BYTES
+    block = data[position:position + _CHUNK_BYTES]
+    found = -1
+    for _ in range(wanted - index[chunk]):
+        found = block.find(b'\n', found + 1)
+    return position + found + 1
+
 # Tool definition
 READ_FILE_DEFINITION = {
     "name": "read_file",
-    "description": "Read the contents of a given relative file path. Use this when you want to see what's inside a file. Do not use this with directory names.",
+    "description": "Read the contents of a given relative file path. Use this when you want to see what's inside a file. Do not use this with directory names. Large files are returned in pages: use offset/limit to read a range of lines, or byte_offset/byte_limit for a range of bytes; ranged results end with the total line count.",
     "input_schema": {
         "type": "object",
         "properties": {
             "path": {
                 "type": "string",
                 "description": "The relative path of a file in the working directory."
+            },
+            "offset": {
+                "type": "integer",
+                "description": "1-based line number to start reading at.",
+                "minimum": 1
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of lines to return. Defaults to 2000 when offset is given or the file is large.",
+                "minimum": 1
+            },
+            "byte_offset": {
+                "type": "integer",
+                "description": "Byte position to start reading at (for files without useful line structure).",
+                "minimum": 0
+            },
+            "byte_limit": {
+                "type": "integer",
+                "description": "Maximum number of bytes to return.",
+                "minimum": 1
             }
         },
         "required": ["path"],
         "additionalProperties": False
     },
-    "tool_function": read_file
-}
\ No newline at end of file
+    "tool_function": read_file,
+    "read_only": True,
+    "path_arguments": ["path"]
+}
@@ -0,0 +1,129 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Union
+
+from .read_file import read_file
+from .walker import glob_matcher, iter_files
+
+# Upper bound on the combined output of one call
+MAX_TOTAL_CHARS = 200_000
+# Files read by one call, after glob expansion
+MAX_FILES = 50
+_MAX_WORKERS = 8
+
+_GLOB_CHARS = re.compile(r"[*?\[{]")
+
+def read_files(files: List[Union[str, Dict[str, Any]]]) -> str:
+    """Read several files in one call. Entries are paths or globs, optionally with a line range."""
+    try:
+        if not files:
+            raise ValueError("files must list at least one path")
+
+        requests = []
+        for item in files:
+            spec = {"path": item} if isinstance(item, str) else dict(item)
+            if not spec.get("path"):
+                raise ValueError("Every entry needs a path")
+            try:
+                paths = _expand(spec["path"])
+            except Exception as e:
+                # Reported in place, like a file that can't be read, so the other entries still come back
+                requests.append({"path": spec["path"], "error": str(e)})
+                continue
+            for path in paths:
+                requests.append({**spec, "path": path})
+
+        skipped = max(0, len(requests) - MAX_FILES)
+        requests = requests[:MAX_FILES]
+
+        # read_file does the reading, so ranges, paging and the content cache behave as for single reads
+        with ThreadPoolExecutor(max_workers=min(_MAX_WORKERS, len(requests) or 1)) as executor:
+            contents = list(executor.map(_read_one, requests))
+
+        output = []
+        remaining = MAX_TOTAL_CHARS
+        for number, (request, content) in enumerate(zip(requests, contents)):
+            if remaining <= 0:
+                skipped += len(requests) - number
+                break
+            output.append(f"==> {request['path']} <==")
+            if len(content) > remaining:
+                content = content[:remaining] + f"\n[... truncated; read {request['path']} with read_file and an offset to see the rest]"
+            output.append(content)
+            output.append("")
+            remaining -= len(content)
+
+        if skipped:
+            output.append(f"[{skipped} more files not shown: output limit reached. Read them in another call.]")
+        return "\n".join(output)
+
+    except Exception as e:
+        raise Exception(f"Error reading files: {str(e)}")
+
+def _expand(path: str) -> List[str]:
+    """Return path itself, or the files a glob matches in sorted order."""
+    match = _GLOB_CHARS.search(path)
+    if match is None:
+        return [path]
+    # Walk from the last directory before the first wildcard, only as deep as the pattern reaches
+    base = os.path.dirname(path[:match.start()]) or "."
+    pattern = os.path.relpath(path, base).replace(os.sep, "/") if base != "." else path
+    max_depth = None if "**" in pattern else pattern.count("/")
+    # A leading "/" anchors the glob at base, so "*.py" means files directly in it, as in a shell
+    matches = glob_matcher("/" + pattern)
+    found = sorted(os.path.normpath(entry.path) for entry in iter_files(base, max_depth=max_depth)
+                   if matches(os.path.relpath(entry.path, base)))
+    if not found:
+        raise FileNotFoundError(f"No files match '{path}'")
+    return found
+
+def _read_one(request: Dict[str, Any]) -> str:
+    if "error" in request:
+        return f"[Error: {request['error']}]"
+    try:
+        return read_file(request["path"], offset=request.get("offset"), limit=request.get("limit"))
+    except Exception as e:
+        return f"[Error: {str(e)}]"
+
+# Tool definition
+READ_FILES_DEFINITION = {
+    "name": "read_files",
+    "description": "Read several files in one call instead of calling read_file repeatedly. Each entry is a path, a glob (e.g. 'src/pkg/*.py', 'docs/**/*.md'; ignored files are skipped) or an object with a path and an optional line range. Files are read concurrently and returned in order, each under a '==> path <==' header, up to a combined size limit.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "files": {
+                "type": "array",
+                "description": "Paths, globs, or {path, offset, limit} objects to read.",
+                "minItems": 1,
+                "items": {
+                    "type": ["string", "object"],
+                    "properties": {
+                        "path": {
+                            "type": "string",
+                            "description": "Relative path or glob of the file(s) to read."
+                        },
+                        "offset": {
+                            "type": "integer",
+                            "description": "1-based line number to start reading at.",
+                            "minimum": 1
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "description": "Maximum number of lines to return.",
+                            "minimum": 1
+                        }
+                    },
+                    "required": ["path"],
+                    "additionalProperties": False
+                }
+            }
+        },
+        "required": ["files"],
+        "additionalProperties": False
+    },
+    "tool_function": read_files,
+    "read_only": True,
+    "path_arguments": ["files"]
+}
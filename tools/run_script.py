@@ -1,56 +1,75 @@
+import asyncio
 import subprocess
 import sys
 import os
-from typing import Optional
+from typing import List, Optional
 
-def run_script(script_path: str, args: str = "", timeout: int = 30, capture_output: bool = True) -> str:
+from . import warm_pool
+from .subprocess_runner import read_bounded_file, run_process, run_process_async, timeout_message
+
+def _build_command(script_path: str, args: str) -> List[str]:
+    """Validate the script path and return the command that runs it."""
+    # Validate parameters
+    if not script_path:
+        raise ValueError("Script path cannot be empty")
+    
+    # Check if script exists
+    if not os.path.exists(script_path):
+        raise FileNotFoundError(f"Script '{script_path}' not found")
+    
+    # Check if it's actually a file
+    if not os.path.isfile(script_path):
+        raise ValueError(f"'{script_path}' is not a file")
+    
+    # Prepare command
+    cmd = [sys.executable, script_path]
+    if args:
+        cmd.extend(args.split())
+    return cmd
+
+def _format_result(cmd: List[str], timeout: int, returncode: int, stdout: str, stderr: str,
+                   notes: List[str] = ()) -> str:
+    output = []
+    output.append(f"🚀 Executed: {' '.join(cmd)}")
+    output.append(f"⏱️  Timeout: {timeout}s")
+    output.extend(notes)
+    output.append(f"📊 Exit Code: {returncode}")
+    
+    if stdout:
+        output.append(f"\n📤 STDOUT:\n{stdout}")
+    
+    if stderr:
+        output.append(f"\n⚠️  STDERR:\n{stderr}")
+    
+    if returncode != 0:
+        output.append(f"\n❌ Script failed with exit code {returncode}")
+    else:
+        output.append(f"\n✅ Script executed successfully")
+    
+    return "\n".join(output)
+
+def run_script(script_path: str, args: str = "", timeout: int = 30, capture_output: bool = True,
+               warm: bool = False, preload: Optional[List[str]] = None) -> str:
     """Execute a Python script and capture its output and errors."""
     try:
-        # Validate parameters
-        if not script_path:
-            raise ValueError("Script path cannot be empty")
-        
-        # Check if script exists
-        if not os.path.exists(script_path):
-            raise FileNotFoundError(f"Script '{script_path}' not found")
-        
-        # Check if it's actually a file
-        if not os.path.isfile(script_path):
-            raise ValueError(f"'{script_path}' is not a file")
-        
-        # Prepare command
-        cmd = [sys.executable, script_path]
-        if args:
-            cmd.extend(args.split())
+        cmd = _build_command(script_path, args)
         
         # Execute the script
-        if capture_output:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                cwd=os.getcwd()
-            )
-            
-            # Format output
-            output = []
-            output.append(f"🚀 Executed: {' '.join(cmd)}")
-            output.append(f"⏱️  Timeout: {timeout}s")
-            output.append(f"📊 Exit Code: {result.returncode}")
-            
-            if result.stdout:
-                output.append(f"\n📤 STDOUT:\n{result.stdout}")
-            
-            if result.stderr:
-                output.append(f"\n⚠️  STDERR:\n{result.stderr}")
-            
-            if result.returncode != 0:
-                output.append(f"\n❌ Script failed with exit code {result.returncode}")
-            else:
-                output.append(f"\n✅ Script executed successfully")
-            
-            return "\n".join(output)
+        if warm and capture_output and warm_pool.available():
+            # Forked from an interpreter that has already started and imported the preload modules
+            worker = warm_pool.get_worker(preload)
+            returncode, stdout, stderr = worker.run(script_path, cmd[2:], timeout, os.getcwd(),
+                                                    read_output=read_bounded_file)
+            if returncode is None:
+                raise subprocess.TimeoutExpired(cmd, timeout, stdout, stderr)
+            notes = []
+            if worker.failed_imports:
+                # The script imports these itself, as it would without warm
+                notes.append(f"🔥 Warm worker couldn't preload: {', '.join(worker.failed_imports)}")
+            return _format_result(cmd, timeout, returncode, stdout, stderr, notes)
+        elif capture_output:
+            returncode, stdout, stderr = run_process(cmd, timeout=timeout)
+            return _format_result(cmd, timeout, returncode, stdout, stderr)
         else:
             # Run without capturing output (for interactive scripts)
             result = subprocess.run(
@@ -61,15 +80,31 @@ def run_script(script_path: str, args: str = "", timeout: int = 30, capture_outp
             
             return f"🚀 Executed: {' '.join(cmd)}\n📊 Exit Code: {result.returncode}"
             
-    except subprocess.TimeoutExpired:
-        raise Exception(f"Script execution timed out after {timeout} seconds")
+    except subprocess.TimeoutExpired as e:
+        raise Exception(timeout_message(f"Script execution timed out after {timeout} seconds", e))
+    except Exception as e:
+        raise Exception(f"Error executing script {script_path}: {str(e)}")
+
+async def run_script_async(script_path: str, args: str = "", timeout: int = 30, capture_output: bool = True,
+                           warm: bool = False, preload: Optional[List[str]] = None) -> str:
+    """Async version of run_script that runs the script as an asyncio subprocess."""
+    if not capture_output or (warm and warm_pool.available()):
+        # Output goes straight to the terminal, or the warm worker blocks on its own; run it off the loop
+        return await asyncio.to_thread(run_script, script_path, args, timeout, capture_output, warm, preload)
+    try:
+        cmd = _build_command(script_path, args)
+        returncode, stdout, stderr = await run_process_async(cmd, timeout=timeout)
+        return _format_result(cmd, timeout, returncode, stdout, stderr)
+            
+    except subprocess.TimeoutExpired as e:
+        raise Exception(timeout_message(f"Script execution timed out after {timeout} seconds", e))
     except Exception as e:
         raise Exception(f"Error executing script {script_path}: {str(e)}")
 
 # Tool definition
 RUN_SCRIPT_DEFINITION = {
     "name": "run_script",
-    "description": "Execute a Python script and capture its output and errors.",
+    "description": "Execute a Python script and capture its output and errors. Set warm=True when running scripts repeatedly to skip interpreter startup and heavy imports.",
     "input_schema": {
         "type": "object",
         "properties": {
@@ -91,10 +126,21 @@ RUN_SCRIPT_DEFINITION = {
                 "type": "boolean",
                 "description": "Whether to capture and return script output. Defaults to True.",
                 "default": True
+            },
+            "warm": {
+                "type": "boolean",
+                "description": "Run the script in a child forked from a warm, already-started Python worker, skipping interpreter startup and the preload imports. Much faster for repeated runs. Requires capture_output. Defaults to False.",
+                "default": False
+            },
+            "preload": {
+                "type": "array",
+                "description": "With warm, modules the worker imports once before forking (e.g. ['numpy', 'pandas']). Defaults to the CODE_AGENT_WARM_MODULES environment variable.",
+                "items": {"type": "string"}
             }
         },
         "required": ["script_path"],
         "additionalProperties": False
     },
-    "tool_function": run_script
+    "tool_function": run_script,
+    "async_tool_function": run_script_async
 } 
\ No newline at end of file
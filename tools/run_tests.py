@@ -1,74 +1,250 @@
+import asyncio
+import shutil
 import subprocess
 import os
 import sys
-from typing import Optional
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
-def run_tests(test_path: str = ".", framework: str = "pytest", args: str = "", timeout: int = 60) -> str:
-    """Run Python tests using pytest or unittest framework."""
-    try:
-        # Validate parameters
-        if not test_path:
-            raise ValueError("Test path cannot be empty")
-        
-        # Check if test path exists
-        if not os.path.exists(test_path):
-            raise FileNotFoundError(f"Test path '{test_path}' not found")
-        
-        # Prepare command based on framework
-        if framework.lower() == "pytest":
-            cmd = [sys.executable, "-m", "pytest", test_path]
-            if args:
-                cmd.extend(args.split())
-        elif framework.lower() == "unittest":
+from . import incremental_tests, structured_results
+from .subprocess_runner import run_process, run_process_async, timeout_message
+
+def _build_command(test_path: str, framework: str, args: str, test_files: Optional[List[str]] = None,
+                   report_path: Optional[str] = None) -> List[str]:
+    """Validate the test path and return the command that runs the tests, or just test_files if given.
+
+    With report_path the runner also writes its results there: JUnit XML for
+    pytest, or JSON from structured_results' unittest runner.
+    """
+    # Validate parameters
+    if not test_path:
+        raise ValueError("Test path cannot be empty")
+    
+    # Check if test path exists
+    if not os.path.exists(test_path):
+        raise FileNotFoundError(f"Test path '{test_path}' not found")
+    
+    # Prepare command based on framework
+    if framework.lower() == "pytest":
+        cmd = [sys.executable, "-m", "pytest"] + (test_files if test_files is not None else [test_path])
+        if report_path:
+            cmd.append(f"--junitxml={report_path}")
+        if args:
+            cmd.extend(args.split())
+    elif framework.lower() == "unittest":
+        if report_path:
+            cmd = [sys.executable, structured_results.RUNNER_SCRIPT, report_path, "discover", "-s", test_path]
+        else:
             cmd = [sys.executable, "-m", "unittest", "discover", "-s", test_path]
-            if args:
-                cmd.extend(args.split())
+        if test_files is not None:
+            # Discovery stays the same; -k keeps only tests whose id starts with one of the modules
+            for path in test_files:
+                module = os.path.splitext(os.path.relpath(path, test_path))[0].replace(os.sep, ".")
+                cmd.extend(["-k", f"{module}.*"])
+        if args:
+            cmd.extend(args.split())
+    else:
+        raise ValueError(f"Unsupported test framework: {framework}. Use 'pytest' or 'unittest'")
+    return cmd
+
+def _plan(test_path: str, framework: str, args: str, parallel: bool, changed_only: bool,
+          failed_first: bool) -> Tuple[List[List[str]], List[str], Dict[str, Any]]:
+    """Work out the commands to run; returns (commands, notes for the output, state for _finish).
+
+    The caller removes state["report_dir"] once the run is over.
+    """
+    _build_command(test_path, framework, args)
+    framework = framework.lower()
+    root = os.getcwd()
+    report_dir = tempfile.mkdtemp(prefix="run-tests-")
+    state = {"history": None, "snapshot": None, "framework": framework, "report_dir": report_dir,
+             "test_path": test_path, "test_files": None, "shards": [[]],
+             "reports": [os.path.join(report_dir, "report-1")]}
+    incremental = parallel or changed_only or failed_first
+    history = incremental_tests.TestHistory.load(root)
+    if not incremental and history.snapshot is None:
+        # A plain run in a tree that never had an incremental one; don't walk the tree or start a history
+        return [_build_command(test_path, framework, args, report_path=state["reports"][0])], [], state
+
+    # Taken before the run, so anything edited while the tests run counts as changed next time
+    snapshot = history.scan()
+    test_files = incremental_tests.find_test_files(test_path, framework, root)
+    state.update(history=history, snapshot=snapshot, test_files=test_files, shards=[test_files])
+    if not incremental:
+        return [_build_command(test_path, framework, args, report_path=state["reports"][0])], [], state
+    if not test_files or (framework == "unittest" and os.path.isfile(test_path)):
+        return ([_build_command(test_path, framework, args, report_path=state["reports"][0])],
+                ["🎯 No test files matching the default patterns; running the test path as usual"], state)
+
+    notes = []
+    selected = test_files
+    if changed_only:
+        changed = history.changed_since_last_run(snapshot)
+        if changed is None:
+            notes.append("🎯 No earlier run or git history to compare against; running all tests")
         else:
-            raise ValueError(f"Unsupported test framework: {framework}. Use 'pytest' or 'unittest'")
-        
-        # Execute tests
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-            cwd=os.getcwd()
-        )
-        
-        # Format output
-        output = []
-        output.append(f"🧪 Running tests with {framework}")
-        output.append(f"📁 Test path: {test_path}")
-        output.append(f"⏱️  Timeout: {timeout}s")
-        output.append(f"📊 Exit Code: {result.returncode}")
-        
-        if result.stdout:
-            output.append(f"\n📤 STDOUT:\n{result.stdout}")
-        
-        if result.stderr:
-            output.append(f"\n⚠️  STDERR:\n{result.stderr}")
+            # Last run's failures are rerun until they pass
+            affected = history.affected_tests(changed, test_files, snapshot) | history.failed
+            selected = [path for path in test_files if path in affected]
+            notes.append(f"🎯 Selected {len(selected)} of {len(test_files)} test files "
+                         f"({len(changed)} files changed since the last run)")
+
+    first = history.failed if failed_first else set()
+    if parallel:
+        shards = incremental_tests.shard(selected, os.cpu_count() or 1, snapshot, first)
+        notes.append(f"🧩 Running {len(shards)} shards in parallel")
+    else:
+        shards = [sorted(selected, key=lambda path: (path not in first, path))] if selected else []
+    if failed_first and first:
+        notes.append(f"⏮️  Running {len(first & set(selected))} previously failing test files first")
+    state["shards"] = shards
+    state["reports"] = [os.path.join(report_dir, f"report-{number}") for number in range(1, len(shards) + 1)]
+    commands = [_build_command(test_path, framework, args, files, report)
+                for files, report in zip(shards, state["reports"])]
+    return commands, notes, state
+
+def _finish(state: Dict[str, Any], results: List[Tuple[int, str, str]]
+            ) -> Tuple[int, str, str, Optional[List[structured_results.CaseResult]]]:
+    """Combine the shards' results into one (returncode, stdout, stderr, test results) and record the run.
+
+    The test results are None if no shard wrote a report. Without a history
+    to record into, state["test_files"] is filled in from the results.
+    """
+    history = state["history"]
+    shards = state["shards"]
+    read_report = (structured_results.read_json_results if state["framework"] == "unittest"
+                   else structured_results.read_junit_xml)
+    cases = None
+    ran = []
+    failed = set()
+    for files, report in zip(shards, state["reports"][:len(results)]):
+        shard_cases = read_report(report)
+        if shard_cases is None:
+            # Without a report, what these files did is unknown; leave their history alone
+            continue
+        cases = (cases or []) + shard_cases
+        ran.extend(files)
+        failed |= incremental_tests.failed_test_files(shard_cases, files)
+    if history is not None:
+        history.record(state["snapshot"], ran, failed)
+        try:
+            history.save()
+        except OSError:
+            pass
+    elif cases:
+        # unittest names modules from its discovery directory, pytest from the root
+        state["test_files"] = structured_results.files_for_results(cases, [state["test_path"], "."])
+
+    if len(results) == 1:
+        return results[0] + (cases,)
+    codes = [returncode for returncode, _, _ in results]
+    # 5 is pytest's "no tests collected", which a shard with only deselected tests may report
+    failing = [code for code in codes if code not in (0, 5)]
+    returncode = max(failing) if failing else (0 if 0 in codes else 5)
+    sections = [(f"── Shard {number}/{len(results)}: {len(files)} test files ──", stdout, stderr)
+                for number, (files, (_, stdout, stderr)) in enumerate(zip(shards, results), 1)]
+    stdout = "\n".join(f"{title}\n{out}" for title, out, _ in sections if out)
+    stderr = "\n".join(f"{title}\n{err}" for title, _, err in sections if err)
+    return returncode, stdout, stderr, cases
+
+def _format_result(test_path: str, framework: str, timeout: int, returncode: int, stdout: str, stderr: str,
+                   notes: List[str] = (), cases: Optional[List[structured_results.CaseResult]] = None,
+                   test_files: List[str] = (), elapsed: float = 0.0, raw_output: bool = False) -> str:
+    output = []
+    output.append(f"🧪 Running tests with {framework}")
+    output.append(f"📁 Test path: {test_path}")
+    output.append(f"⏱️  Timeout: {timeout}s")
+    output.extend(notes)
+    output.append(f"📊 Exit Code: {returncode}")
+    
+    if cases is not None:
+        output.append(structured_results.summarize(cases, test_files, elapsed))
+    
+    # The summary stands in for the runner's own output, unless it has nothing to say about a failed run
+    if raw_output or cases is None or (not cases and returncode not in (0, 5)):
+        if stdout:
+            output.append(f"\n📤 STDOUT:\n{stdout}")
         
-        # Interpret results
-        if result.returncode == 0:
-            output.append(f"\n✅ All tests passed!")
-        elif result.returncode == 1:
-            output.append(f"\n❌ Some tests failed")
-        elif result.returncode == 2:
-            output.append(f"\n⚠️  Test execution error")
-        else:
-            output.append(f"\n❓ Unexpected exit code: {result.returncode}")
+        if stderr:
+            output.append(f"\n⚠️  STDERR:\n{stderr}")
+    
+    # Interpret results
+    if returncode == 0:
+        output.append(f"\n✅ All tests passed!")
+    elif returncode == 1:
+        output.append(f"\n❌ Some tests failed")
+    elif returncode == 2:
+        output.append(f"\n⚠️  Test execution error")
+    elif returncode == 5:
+        output.append(f"\n⚠️  No tests were collected")
+    else:
+        output.append(f"\n❓ Unexpected exit code: {returncode}")
+    
+    return "\n".join(output)
+
+def _nothing_to_run(test_path: str, framework: str, notes: List[str]) -> str:
+    return "\n".join([f"🧪 Running tests with {framework}", f"📁 Test path: {test_path}"] + notes
+                     + ["\n✅ No tests are affected by the changes since the last run"])
+
+def run_tests(test_path: str = ".", framework: str = "pytest", args: str = "", timeout: int = 60,
+              parallel: bool = False, changed_only: bool = False, failed_first: bool = False,
+              raw_output: bool = False) -> str:
+    """Run Python tests using pytest or unittest framework."""
+    try:
+        commands, notes, state = _plan(test_path, framework, args, parallel, changed_only, failed_first)
+        try:
+            if not commands:
+                _finish(state, [])
+                return _nothing_to_run(test_path, framework, notes)
+            
+            # Execute tests, one process per shard
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+                results = list(executor.map(lambda cmd: run_process(cmd, timeout=timeout), commands))
+            elapsed = time.perf_counter() - started
+            returncode, stdout, stderr, cases = _finish(state, results)
+        finally:
+            shutil.rmtree(state["report_dir"], ignore_errors=True)
+        return _format_result(test_path, framework, timeout, returncode, stdout, stderr, notes,
+                              cases, state["test_files"] or [], elapsed, raw_output)
         
-        return "\n".join(output)
+    except subprocess.TimeoutExpired as e:
+        raise Exception(timeout_message(f"Test execution timed out after {timeout} seconds", e))
+    except Exception as e:
+        raise Exception(f"Error running tests: {str(e)}")
+
+async def run_tests_async(test_path: str = ".", framework: str = "pytest", args: str = "", timeout: int = 60,
+                          parallel: bool = False, changed_only: bool = False, failed_first: bool = False,
+                          raw_output: bool = False) -> str:
+    """Async version of run_tests that runs the test runner as an asyncio subprocess."""
+    try:
+        # Planning walks the tree and parses imports; keep it off the event loop
+        commands, notes, state = await asyncio.to_thread(
+            _plan, test_path, framework, args, parallel, changed_only, failed_first)
+        try:
+            if not commands:
+                await asyncio.to_thread(_finish, state, [])
+                return _nothing_to_run(test_path, framework, notes)
+            started = time.perf_counter()
+            results = await asyncio.gather(*(run_process_async(cmd, timeout=timeout) for cmd in commands))
+            elapsed = time.perf_counter() - started
+            returncode, stdout, stderr, cases = await asyncio.to_thread(_finish, state, list(results))
+        finally:
+            shutil.rmtree(state["report_dir"], ignore_errors=True)
+        return _format_result(test_path, framework, timeout, returncode, stdout, stderr, notes,
+                              cases, state["test_files"] or [], elapsed, raw_output)
         
-    except subprocess.TimeoutExpired:
-        raise Exception(f"Test execution timed out after {timeout} seconds")
+    except subprocess.TimeoutExpired as e:
+        raise Exception(timeout_message(f"Test execution timed out after {timeout} seconds", e))
     except Exception as e:
         raise Exception(f"Error running tests: {str(e)}")
 
 # Tool definition
 RUN_TESTS_DEFINITION = {
     "name": "run_tests",
-    "description": "Run Python tests using pytest or unittest framework.",
+    "description": "Run Python tests using pytest or unittest framework and get a compact summary: counts, failing tests with the end of their tracebacks, and the slowest tests. In an edit-test loop, use changed_only=True to run just the tests affected by your changes, parallel=True to use all CPU cores, and failed_first=True to see last run's failures first.",
     "input_schema": {
         "type": "object",
         "properties": {
@@ -91,10 +267,31 @@ RUN_TESTS_DEFINITION = {
                 "type": "integer",
                 "description": "Timeout in seconds for test execution. Defaults to 60.",
                 "default": 60
+            },
+            "parallel": {
+                "type": "boolean",
+                "description": "Split the test files into shards and run them at once, one process per CPU core. Defaults to False.",
+                "default": False
+            },
+            "changed_only": {
+                "type": "boolean",
+                "description": "Only run test files that import (directly or indirectly) a file changed since the last run_tests call, or since git HEAD before the first one, plus the files that failed last time. Defaults to False.",
+                "default": False
+            },
+            "failed_first": {
+                "type": "boolean",
+                "description": "Run the test files that failed in the last run first. Defaults to False.",
+                "default": False
+            },
+            "raw_output": {
+                "type": "boolean",
+                "description": "Also include the test runner's own stdout and stderr after the summary. Defaults to False.",
+                "default": False
             }
         },
         "required": [],
         "additionalProperties": False
     },
-    "tool_function": run_tests
+    "tool_function": run_tests,
+    "async_tool_function": run_tests_async
 } 
\ No newline at end of file
@@ -1,8 +1,19 @@
+import mmap
+import multiprocessing
 import os
 import re
-from typing import List, Dict
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Dict, Optional, Tuple, Union
 
-def search_files(pattern: str, directory: str = ".", file_pattern: str = "*", case_sensitive: bool = False) -> str:
+from .search_index import candidate_files
+from .walker import glob_matcher, iter_files
+
+def search_files(pattern: str, directory: str = ".", file_pattern: Union[str, List[str]] = "*",
+                 exclude_pattern: Optional[Union[str, List[str]]] = None, case_sensitive: bool = False,
+                 use_index: bool = False, parallel: bool = False, max_results: int = 500,
+                 max_matches_per_file: int = 50, context_lines: int = 0, include_ignored: bool = False) -> str:
     """Search for text patterns across multiple files in a directory."""
     try:
         # Validate parameters
@@ -19,83 +30,264 @@ def search_files(pattern: str, directory: str = ".", file_pattern: str = "*", ca
         flags = 0 if case_sensitive else re.IGNORECASE
         regex = re.compile(pattern, flags)
         
-        # Convert file_pattern to regex
-        if file_pattern == "*":
-            file_regex = re.compile(r".*")
-        else:
-            # Convert glob pattern to regex
-            file_regex = re.compile(file_pattern.replace("*", ".*"))
+        # Compile the include and exclude globs into one matcher over relative paths
+        matches_file = glob_matcher(file_pattern, exclude_pattern)
+        
+        if max_results < 0 or max_matches_per_file < 0 or context_lines < 0:
+            raise ValueError("max_results, max_matches_per_file and context_lines must not be negative")
         
-        results = []
         total_files_searched = 0
         
-        # Walk through directory
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                file_path = os.path.join(root, file)
-                relative_path = os.path.relpath(file_path, directory)
-                
-                # Check if file matches pattern
-                if not file_regex.match(file):
-                    continue
-                
-                total_files_searched += 1
-                
+        # Walk through directory, skipping VCS and dependency directories and ignored files
+        if include_ignored:
+            walked = list(iter_files(directory, use_ignore_files=False, pruned_dirs=()))
+        else:
+            walked = list(iter_files(directory))
+        
+        # With the index, only files that contain the pattern's trigrams are opened
+        candidates = None
+        if use_index:
+            entries = []
+            for entry in walked:
                 try:
-                    # Read file content
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    # Find matches
-                    matches = list(regex.finditer(content))
-                    
-                    if matches:
-                        file_result = {
-                            "file": relative_path,
-                            "matches": []
-                        }
-                        
-                        for match in matches:
-                            # Get line number
-                            line_start = content.rfind('\n', 0, match.start()) + 1
-                            line_end = content.find('\n', match.end())
-                            if line_end == -1:
-                                line_end = len(content)
-                            
-                            line_content = content[line_start:line_end].strip()
-                            line_number = content[:match.start()].count('\n') + 1
-                            
-                            file_result["matches"].append({
-                                "line": line_number,
-                                "content": line_content,
-                                "match": match.group()
-                            })
-                        
-                        results.append(file_result)
-                        
-                except (UnicodeDecodeError, PermissionError):
-                    # Skip binary files or files we can't read
+                    entries.append((os.path.relpath(entry.path, directory), entry.stat()))
+                except OSError:
                     continue
+            candidates = candidate_files(directory, entries, pattern, flags)
         
-        # Format results
-        if not results:
-            return f"No matches found for pattern '{pattern}' in {total_files_searched} files"
+        to_scan = []
+        for entry in walked:
+            # Check if file matches pattern
+            relative_path = os.path.relpath(entry.path, directory)
+            if not matches_file(relative_path):
+                continue
+            
+            total_files_searched += 1
+            if candidates is not None and relative_path not in candidates:
+                continue
+            to_scan.append((entry.path, relative_path))
         
-        output = [f"Found {len(results)} files with matches for pattern '{pattern}':\n"]
+        if parallel:
+            file_results = _scan_parallel(to_scan, pattern, flags, max_matches_per_file, context_lines)
+        else:
+            file_results = ((rel, _search_file(path, regex, max_matches_per_file, context_lines))
+                            for path, rel in to_scan)
         
-        for result in results:
-            output.append(f"📁 {result['file']}:")
-            for match in result['matches']:
-                output.append(f"  Line {match['line']}: {match['content']}")
+        # Format results as they arrive, stopping once max_results matches are shown
+        output = []
+        files_with_matches = 0
+        total_matches = 0
+        stopped_early = False
+        for relative_path, (matches, capped) in file_results:
+            if not matches:
+                continue
+            if max_results and total_matches >= max_results:
+                # The previous file used up max_results exactly; don't list this one
+                stopped_early = True
+                break
+            files_with_matches += 1
+            output.append(f"📁 {relative_path}:")
+            for match in matches:
+                if max_results and total_matches >= max_results:
+                    stopped_early = True
+                    break
+                total_matches += 1
+                output.extend(_format_match(match))
+            if capped and not stopped_early:
+                output.append(f"  ... more matches in this file (showing the first {max_matches_per_file})")
             output.append("")
+            if stopped_early:
+                break
+        
+        # Format results
+        if not files_with_matches:
+            return f"No matches found for pattern '{pattern}' in {total_files_searched} files"
         
+        output.insert(0, f"Found {files_with_matches} files with matches for pattern '{pattern}':\n")
+        if stopped_early:
+            output.append(f"⚠️  Stopped after {max_results} matches (max_results); narrow the pattern or directory to see more")
         output.append(f"Total files searched: {total_files_searched}")
+        if candidates is not None:
+            output.append(f"Index narrowed the search to {len(candidates)} candidate files")
         
         return "\n".join(output)
         
     except Exception as e:
         raise Exception(f"Error searching files: {str(e)}")
 
+# Lines longer than this (minified code, data files) are shown as a window around the match
+_MAX_LINE_CHARS = 300
+
+def _iter_matches(data, regex: re.Pattern, context_lines: int = 0):
+    """Yield (line_number, line, match_text, before, after) for each match in str, bytes or mmap data.
+
+    Line numbers and line bounds are tracked in one forward pass: only the
+    text between consecutive matches is scanned for newlines, and the end of
+    the current line is remembered, so many matches on one huge line stay
+    linear. before/after hold (line_number, line) pairs of context.
+    """
+    newline = '\n' if isinstance(data, str) else b'\n'
+    line_number = 1
+    line_start = 0
+    line_end = -1
+    counted_to = 0
+    for match in regex.finditer(data):
+        start = match.start()
+        if start > counted_to:
+            gap = data[counted_to:start] if isinstance(data, mmap.mmap) else None
+            newlines = gap.count(newline) if gap is not None else data.count(newline, counted_to, start)
+            if newlines:
+                line_number += newlines
+                line_start = data.rfind(newline, counted_to, start) + 1
+            counted_to = start
+        if line_end < start or line_end == -1:
+            line_end = data.find(newline, start)
+            if line_end == -1:
+                line_end = len(data)
+        
+        line = _clip_line(data, line_start, line_end, start)
+        before = []
+        position = line_start
+        for offset in range(1, context_lines + 1):
+            if position == 0:
+                break
+            previous_start = data.rfind(newline, 0, position - 1) + 1
+            before.insert(0, (line_number - offset, _clip_line(data, previous_start, position - 1)))
+            position = previous_start
+        after = []
+        position = line_end
+        for offset in range(1, context_lines + 1):
+            if position >= len(data):
+                break
+            next_end = data.find(newline, position + 1)
+            if next_end == -1:
+                next_end = len(data)
+            after.append((line_number + offset, _clip_line(data, position + 1, next_end)))
+            position = next_end
+        
+        yield line_number, line, _decode(match.group()), before, after
+
+def _clip_line(data, start: int, end: int, match_start: int = -1) -> str:
+    """Return data[start:end] stripped, cut to a window around match_start when the line is very long."""
+    if end - start > _MAX_LINE_CHARS:
+        # Only the window is sliced, so repeated matches on a huge line don't copy it each time
+        left = max(start, min(match_start - _MAX_LINE_CHARS // 3, end - _MAX_LINE_CHARS))
+        right = left + _MAX_LINE_CHARS
+        text = _decode(data[left:right]).strip()
+        return ("…" if left > start else "") + text + ("…" if right < end else "")
+    return _decode(data[start:end]).strip()
+
+def _decode(text) -> str:
+    return text if isinstance(text, str) else text.decode('utf-8', errors='replace')
+
+def _collect(data, regex: re.Pattern, max_matches: int, context_lines: int) -> Tuple[List[tuple], bool]:
+    """Return up to max_matches matches and whether more were left unreported."""
+    matches = []
+    for match in _iter_matches(data, regex, context_lines):
+        if max_matches and len(matches) >= max_matches:
+            return matches, True
+        matches.append(match)
+    return matches, False
+
+def _format_match(match: tuple) -> List[str]:
+    line_number, line, _, before, after = match
+    lines = [f"  Line {number}- {text}" for number, text in before]
+    lines.append(f"  Line {line_number}: {line}")
+    lines.extend(f"  Line {number}- {text}" for number, text in after)
+    return lines
+
+def _search_file(file_path: str, regex: re.Pattern, max_matches: int = 0,
+                 context_lines: int = 0) -> Tuple[List[tuple], bool]:
+    """Return the matches of regex in a text file; binary or unreadable files have none."""
+    try:
+        # Read file content
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except (UnicodeDecodeError, PermissionError):
+        # Skip binary files or files we can't read
+        return [], False
+    return _collect(content, regex, max_matches, context_lines)
+
+# Files are sniffed for NUL bytes in this prefix to detect binaries
+_BINARY_SNIFF_BYTES = 8192
+# Below this many files the pool's IPC costs more than it saves
+_PARALLEL_MIN_FILES = 64
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    # The regex engine holds the GIL, so scanning in parallel needs processes.
+    # spawn avoids forking a parent that may be running tool threads.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def _scan_parallel(files: List[Tuple[str, str]], pattern: str, flags: int, max_matches: int,
+                   context_lines: int) -> Iterator[Tuple[str, Tuple[List[tuple], bool]]]:
+    """Scan (file_path, relative_path) pairs across the worker pool with a bytes regex over mmapped files.
+
+    Yields (relative_path, (matches, capped)) in walk order, chunk by chunk.
+    """
+    try:
+        re.compile(pattern.encode("utf-8"), flags)
+    except re.error:
+        # Patterns that only make sense on str (e.g. named unicode escapes) are scanned in-process
+        regex = re.compile(pattern, flags)
+        for path, rel in files:
+            yield rel, _search_file(path, regex, max_matches, context_lines)
+        return
+    
+    workers = os.cpu_count() or 1
+    if workers == 1 or len(files) < _PARALLEL_MIN_FILES:
+        yield from _scan_chunk(files, pattern, flags, max_matches, context_lines)
+        return
+    
+    chunk_size = max(16, len(files) // (workers * 4) + 1)
+    chunks = [files[i:i + chunk_size] for i in range(0, len(files), chunk_size)]
+    count = len(chunks)
+    done = 0
+    try:
+        for chunk_results in _get_pool().map(_scan_chunk, chunks, [pattern] * count, [flags] * count,
+                                             [max_matches] * count, [context_lines] * count):
+            done += 1
+            yield from chunk_results
+    except BrokenProcessPool:
+        # A worker died; drop the pool so later searches start a fresh one, and finish this one here
+        _reset_pool()
+        for chunk in chunks[done:]:
+            yield from _scan_chunk(chunk, pattern, flags, max_matches, context_lines)
+
+def _scan_chunk(files: List[Tuple[str, str]], pattern: str, flags: int, max_matches: int = 0,
+                context_lines: int = 0) -> List[Tuple[str, Tuple[List[tuple], bool]]]:
+    regex = re.compile(pattern.encode("utf-8"), flags)
+    return [(relative_path, _scan_mmap(file_path, regex, max_matches, context_lines))
+            for file_path, relative_path in files]
+
+def _scan_mmap(file_path: str, regex: re.Pattern, max_matches: int = 0,
+               context_lines: int = 0) -> Tuple[List[tuple], bool]:
+    """Match a bytes regex over the mmapped file, skipping files whose first bytes contain NUL."""
+    try:
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return [], False
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if b"\0" in data[:_BINARY_SNIFF_BYTES]:
+                    return [], False
+                return _collect(data, regex, max_matches, context_lines)
+    except (OSError, ValueError):
+        return [], False
+
 # Tool definition
 SEARCH_FILES_DEFINITION = {
     "name": "search_files",
@@ -113,18 +305,56 @@ SEARCH_FILES_DEFINITION = {
                 "default": "."
             },
             "file_pattern": {
-                "type": "string",
-                "description": "File pattern to match (e.g., '*.py', '*.txt'). Defaults to all files.",
+                "type": ["string", "array"],
+                "items": {"type": "string"},
+                "description": "Glob or list of globs for the files to search (e.g., '*.py', '*.{ts,tsx}', ['src/**/*.py', '*.md']). Patterns without a '/' match file names at any depth; '**' matches any number of directories. Defaults to all files.",
                 "default": "*"
             },
+            "exclude_pattern": {
+                "type": ["string", "array"],
+                "items": {"type": "string"},
+                "description": "Glob or list of globs for files to leave out (e.g., 'tests/**', '*.min.js')."
+            },
             "case_sensitive": {
                 "type": "boolean",
                 "description": "Whether the search should be case sensitive. Defaults to False.",
                 "default": False
+            },
+            "use_index": {
+                "type": "boolean",
+                "description": "Use a persistent trigram index of the directory to skip files that cannot match. Much faster for repeated searches of large trees; the first indexed search builds the index. Defaults to False.",
+                "default": False
+            },
+            "parallel": {
+                "type": "boolean",
+                "description": "Scan files on a pool of worker processes using memory-mapped files and a bytes regex. Faster on large trees; binary files are skipped by sniffing their first bytes. Case folding and classes like \\w use ASCII rules in this mode. Defaults to False.",
+                "default": False
+            },
+            "max_results": {
+                "type": "integer",
+                "description": "Stop after reporting this many matches in total (0 for no limit). Defaults to 500.",
+                "default": 500
+            },
+            "max_matches_per_file": {
+                "type": "integer",
+                "description": "Report at most this many matches per file (0 for no limit). Defaults to 50.",
+                "default": 50
+            },
+            "context_lines": {
+                "type": "integer",
+                "description": "Number of lines of context to show before and after each match. Defaults to 0.",
+                "default": 0
+            },
+            "include_ignored": {
+                "type": "boolean",
+                "description": "Also search files excluded by .gitignore/.ignore rules and inside .git, node_modules, virtualenvs and caches. Defaults to False.",
+                "default": False
             }
         },
         "required": ["pattern"],
         "additionalProperties": False
     },
-    "tool_function": search_files
+    "tool_function": search_files,
+    "read_only": True,
+    "path_arguments": ["directory"]
 } 
\ No newline at end of file
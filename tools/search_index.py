@@ -0,0 +1,259 @@
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# Only trigrams made of lowercased identifier characters are indexed; they are
+# what code searches are made of, and skipping punctuation keeps postings small.
+_WORD_RUN = re.compile(rb"[a-z0-9_]{3,}")
+_BINARY_SNIFF_BYTES = 8192
+# Larger files are not indexed and are always treated as candidates
+MAX_INDEXED_FILE_BYTES = 8 * 1024 * 1024
+# Queries with more alternatives than this are not narrowed
+_MAX_ALTERNATIVES = 16
+
+def default_index_dir() -> str:
+    """Directory holding index files; CODE_AGENT_INDEX_DIR overrides ~/.cache/code-agent/search-index."""
+    return os.environ.get("CODE_AGENT_INDEX_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "code-agent", "search-index"
+    )
+
+def trigrams_of(data: bytes) -> Set[bytes]:
+    """Return the set of identifier trigrams in data, case-folded to ASCII lowercase."""
+    return {run[i:i + 3] for run in _WORD_RUN.findall(data.lower()) for i in range(len(run) - 2)}
+
+class TrigramIndex:
+    """A persistent trigram index over the files under one directory.
+
+    Every indexed file gets an id, and each trigram maps to a sorted array of
+    the ids of files containing it. When a file's mtime or size changes it is
+    re-read under a fresh id and the old id is retired; retired ids are
+    filtered out of query results and purged from the postings once they
+    outnumber live ones. The index is pickled to disk after each refresh that
+    changed something.
+    """
+
+    VERSION = 1
+
+    def __init__(self, root: str, path: str):
+        self.root: str = root
+        self.path: str = path
+        self.next_id: int = 0
+        # relpath -> (file id, mtime_ns, size)
+        self.files: Dict[str, Tuple[int, int, int]] = {}
+        self.postings: Dict[bytes, array] = {}
+        # ids of files that could not be indexed (too large or unreadable) and always need scanning
+        self.unindexed: Set[int] = set()
+        self.binary: Set[int] = set()
+        self.retired: int = 0
+
+    @classmethod
+    def load(cls, root: str, index_dir: Optional[str] = None) -> "TrigramIndex":
+        root = os.path.abspath(root)
+        key = hashlib.sha1(root.encode("utf-8")).hexdigest()
+        path = os.path.join(index_dir or default_index_dir(), f"{key}.pickle")
+        try:
+            with open(path, "rb") as file:
+                index = pickle.load(file)
+            if isinstance(index, cls) and index.VERSION == cls.VERSION and index.root == root:
+                index.path = path
+                return index
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass
+        return cls(root, path)
+
+    def refresh(self, entries: Iterable[Tuple[str, os.stat_result]]) -> bool:
+        """Bring the index in line with the given (relpath, stat) pairs; return True if anything changed."""
+        seen = set()
+        changed = False
+        for relpath, stat in entries:
+            seen.add(relpath)
+            known = self.files.get(relpath)
+            if known is not None and known[1] == stat.st_mtime_ns and known[2] == stat.st_size:
+                continue
+            if known is not None:
+                self._retire(known[0])
+            self._add(relpath, stat)
+            changed = True
+
+        for relpath in [p for p in self.files if p not in seen]:
+            self._retire(self.files.pop(relpath)[0])
+            changed = True
+
+        if self.retired > len(self.files):
+            self._purge_retired()
+        return changed
+
+    def candidates(self, query: Optional[List[Set[bytes]]]) -> Optional[Set[str]]:
+        """Return the relpaths that may match a query from query_trigrams(), or None if it cannot narrow."""
+        if query is None:
+            return None
+        ids: Set[int] = set()
+        for required in query:
+            postings = [self.postings.get(trigram, ()) for trigram in required]
+            postings.sort(key=len)
+            matching = set(postings[0])
+            for posting in postings[1:]:
+                if not matching:
+                    break
+                matching.intersection_update(posting)
+            ids |= matching
+        ids |= self.unindexed
+        ids -= self.binary
+        return {relpath for relpath, (file_id, _, _) in self.files.items() if file_id in ids}
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _add(self, relpath: str, stat: os.stat_result):
+        file_id = self.next_id
+        self.next_id += 1
+        self.files[relpath] = (file_id, stat.st_mtime_ns, stat.st_size)
+        if stat.st_size > MAX_INDEXED_FILE_BYTES:
+            self.unindexed.add(file_id)
+            return
+        try:
+            with open(os.path.join(self.root, relpath), "rb") as file:
+                data = file.read()
+        except OSError:
+            self.unindexed.add(file_id)
+            return
+        if b"\0" in data[:_BINARY_SNIFF_BYTES]:
+            self.binary.add(file_id)
+            return
+        for trigram in trigrams_of(data):
+            posting = self.postings.get(trigram)
+            if posting is None:
+                self.postings[trigram] = array("I", (file_id,))
+            else:
+                posting.append(file_id)
+
+    def _retire(self, file_id: int):
+        self.unindexed.discard(file_id)
+        self.binary.discard(file_id)
+        self.retired += 1
+
+    def _purge_retired(self):
+        live = {file_id for file_id, _, _ in self.files.values()}
+        for trigram in list(self.postings):
+            kept = array("I", (file_id for file_id in self.postings[trigram] if file_id in live))
+            if kept:
+                self.postings[trigram] = kept
+            else:
+                del self.postings[trigram]
+        self.retired = 0
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["path"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.path = ""
+
+def query_trigrams(pattern: str, flags: int = 0) -> Optional[List[Set[bytes]]]:
+    """Work out which trigrams a file must contain for the regex to match anywhere in it.
+
+    Returns a list of alternatives, each a set of trigrams that must all be
+    present, or None if the pattern gives nothing to narrow by (for example
+    when it has a part with no literal run of three identifier characters).
+    Only literal text the regex cannot match without is used, so the result
+    never excludes a file that matches (short of case-insensitive matches
+    against the few non-ASCII letters that fold to ASCII, such as the Kelvin
+    sign).
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return None
+    alternatives = _required_literals(list(parsed))
+    if alternatives is None:
+        return None
+    query = []
+    for literals in alternatives:
+        required: Set[bytes] = set()
+        for literal in literals:
+            required |= trigrams_of(literal.encode("utf-8"))
+        if not required:
+            return None
+        query.append(required)
+    return query
+
+def _required_literals(items) -> Optional[List[List[str]]]:
+    """Return alternatives of literal strings the parsed sequence requires, or None if unknown."""
+    alternatives: List[List[str]] = [[]]
+    run: List[str] = []
+
+    def end_run():
+        if run:
+            for literals in alternatives:
+                literals.append("".join(run))
+            run.clear()
+
+    for op, value in items:
+        if op is sre_parse.LITERAL:
+            run.append(chr(value))
+            continue
+        end_run()
+        if op is sre_parse.SUBPATTERN:
+            inner = _required_literals(list(value[-1]))
+        elif op is sre_parse.BRANCH:
+            inner = []
+            for branch in value[1]:
+                branch_literals = _required_literals(list(branch))
+                if branch_literals is None:
+                    inner = None
+                    break
+                inner.extend(branch_literals)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and value[0] >= 1:
+            inner = _required_literals(list(value[2]))
+        else:
+            continue
+
+        if inner is None or len(alternatives) * len(inner) > _MAX_ALTERNATIVES:
+            continue
+        alternatives = [outer + literals for outer in alternatives for literals in inner]
+    end_run()
+    return alternatives
+
+_INDEXES: Dict[Tuple[str, str], TrigramIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+def candidate_files(directory: str, entries: Iterable[Tuple[str, os.stat_result]], pattern: str,
+                    flags: int = 0, index_dir: Optional[str] = None) -> Optional[Set[str]]:
+    """Refresh the directory's index from (relpath, stat) pairs and return the relpaths that may match pattern.
+
+    Returns None when the pattern cannot be narrowed. Indexes stay loaded for
+    the rest of the process, so only the first search in a session reads the
+    index file.
+    """
+    key = (os.path.abspath(directory), index_dir or default_index_dir())
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = _INDEXES[key] = TrigramIndex.load(directory, index_dir)
+        if index.refresh(entries):
+            try:
+                index.save()
+            except OSError:
+                pass
+        return index.candidates(query_trigrams(pattern, flags))
@@ -0,0 +1,218 @@
+"""
+Machine-readable test results for run_tests.
+
+pytest reports through its built-in JUnit XML output. unittest has no
+equivalent, so this file doubles as a drop-in for "python -m unittest" (run
+it as a script with the JSON output path first) that records every test's
+outcome and duration. Both are read back into CaseResult lists, which
+summarize() turns into a compact report. Like warm_pool, it only imports the
+standard library so it can run as a script.
+"""
+
+import json
+import os
+import sys
+import time
+import unittest
+import xml.etree.ElementTree as ET
+from typing import Iterable, List, Optional, Tuple
+
+RUNNER_SCRIPT = os.path.abspath(__file__)
+
+# Per failure, the last lines of the traceback are kept; that's where the assertion is
+MAX_TRACEBACK_LINES = 15
+MAX_TRACEBACK_CHARS = 1500
+MAX_FAILURES_SHOWN = 25
+SLOWEST_SHOWN = 10
+# Faster tests aren't worth listing as slow
+MIN_SLOW_SECONDS = 0.01
+
+OUTCOMES = ("passed", "failed", "error", "skipped")
+
+class CaseResult:
+    """The outcome of one test: passed, failed, error or skipped."""
+
+    def __init__(self, classname: str, name: str, outcome: str, duration: float, details: str = ""):
+        self.classname = classname
+        self.name = name
+        self.outcome = outcome
+        self.duration = duration
+        self.details = details
+
+def read_junit_xml(path: str) -> Optional[List[CaseResult]]:
+    """Results from a JUnit XML report, or None if the file is missing or unreadable."""
+    try:
+        tree = ET.parse(path)
+    except (OSError, ET.ParseError):
+        return None
+    results = []
+    for case in tree.iter("testcase"):
+        outcome, details = "passed", ""
+        for child in case:
+            if child.tag in ("failure", "error", "skipped"):
+                outcome = "failed" if child.tag == "failure" else child.tag
+                details = child.text or child.get("message") or ""
+                break
+        try:
+            duration = float(case.get("time") or 0)
+        except ValueError:
+            duration = 0.0
+        results.append(CaseResult(case.get("classname") or "", case.get("name") or "", outcome, duration, details))
+    return results
+
+def read_json_results(path: str) -> Optional[List[CaseResult]]:
+    """Results written by this file's unittest runner, or None if the file is missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            records = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return [CaseResult(record["classname"], record["name"], record["outcome"], record["time"], record["details"])
+            for record in records]
+
+def file_for_module(dotted: str, test_files: Iterable[str]) -> Tuple[Optional[str], List[str]]:
+    """Find the test file a dotted module (or module.Class) name refers to.
+
+    Runners name modules relative to their own root or discovery directory,
+    so the longest leading part of the name that is a suffix of a test file's
+    path wins. Returns (file, the rest of the name's parts), or (None, all parts).
+    """
+    parts = [part for part in dotted.split(".") if part]
+    test_files = list(test_files)
+    for end in range(len(parts), 0, -1):
+        suffix = "/".join(parts[:end]) + ".py"
+        for path in test_files:
+            if path == suffix or path.endswith("/" + suffix):
+                return path, parts[end:]
+    return None, parts
+
+def files_for_results(results: Iterable[CaseResult], directories: Iterable[str]) -> List[str]:
+    """Test files (relative to the cwd) the results' module names refer to, looked up under each directory.
+
+    A cheaper stand-in for listing every test file when only the ones that
+    ran are needed for file_for_module().
+    """
+    directories = list(directories)
+    files = set()
+    for dotted in {result.classname or result.name for result in results}:
+        parts = [part for part in dotted.split(".") if part]
+        for end in range(len(parts), 0, -1):
+            for directory in directories:
+                candidate = os.path.join(directory, *parts[:end]) + ".py"
+                if os.path.isfile(candidate):
+                    files.add(os.path.relpath(candidate).replace(os.sep, "/"))
+    return sorted(files)
+
+def test_id(result: CaseResult, test_files: Iterable[str]) -> str:
+    """A pytest-style id such as tests/test_x.py::TestY::test_z, falling back to the runner's names."""
+    path, rest = file_for_module(result.classname, test_files)
+    if path is None:
+        return "::".join(part for part in (result.classname, result.name) if part)
+    return "::".join([path] + rest + [result.name])
+
+def trim_traceback(details: str) -> str:
+    lines = details.rstrip().splitlines()
+    omitted = len(lines) - MAX_TRACEBACK_LINES
+    text = "\n".join(lines[-MAX_TRACEBACK_LINES:])
+    if len(text) > MAX_TRACEBACK_CHARS:
+        text = text[-MAX_TRACEBACK_CHARS:]
+        omitted = max(omitted, 1)
+    return (f"[... {omitted} earlier lines]\n" if omitted > 0 else "") + text
+
+def summarize(results: List[CaseResult], test_files: Iterable[str], elapsed: float) -> str:
+    """Counts, the failing tests with the end of their tracebacks, and the slowest tests."""
+    test_files = list(test_files)
+    counts = {outcome: 0 for outcome in OUTCOMES}
+    for result in results:
+        counts[result.outcome] = counts.get(result.outcome, 0) + 1
+    output = [f"📋 Results: {counts['passed']} passed, {counts['failed']} failed, "
+              f"{counts['error']} errors, {counts['skipped']} skipped in {elapsed:.2f}s"]
+
+    failing = [result for result in results if result.outcome in ("failed", "error")]
+    if failing:
+        output.append("\n❌ Failures:")
+        for result in failing[:MAX_FAILURES_SHOWN]:
+            label = "ERROR" if result.outcome == "error" else "FAILED"
+            output.append(f"  {label} {test_id(result, test_files)}")
+            if result.details:
+                output.extend("      " + line for line in trim_traceback(result.details).splitlines())
+        if len(failing) > MAX_FAILURES_SHOWN:
+            output.append(f"  ... and {len(failing) - MAX_FAILURES_SHOWN} more")
+
+    timed = [result for result in results if result.outcome != "skipped" and result.duration >= MIN_SLOW_SECONDS]
+    timed = sorted(timed, key=lambda result: -result.duration)[:SLOWEST_SHOWN]
+    if timed:
+        output.append("\n🐢 Slowest tests:")
+        output.extend(f"  {result.duration:7.2f}s  {test_id(result, test_files)}" for result in timed)
+    return "\n".join(output)
+
+# ---- unittest runner side ----
+
+_output_path: Optional[str] = None
+
+class _RecordingResult(unittest.TextTestResult):
+    """A TextTestResult that also records each test's outcome and duration."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.records = []
+        self._started = None
+
+    def startTest(self, test):
+        self._started = time.perf_counter()
+        super().startTest(test)
+
+    def _record(self, test, outcome: str, details: str = ""):
+        # Module import and class setup errors arrive without a startTest
+        duration = time.perf_counter() - self._started if self._started is not None else 0.0
+        classname, _, name = test.id().rpartition(".")
+        self.records.append({"classname": classname, "name": name, "outcome": outcome,
+                             "time": round(duration, 6), "details": details})
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self._record(test, "passed")
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._record(test, "failed", self._exc_info_to_string(err, test))
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._record(test, "error", self._exc_info_to_string(err, test))
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._record(test, "skipped", reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self._record(test, "skipped", "expected failure")
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self._record(test, "failed", "unexpected success")
+
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is not None:
+            failed = issubclass(err[0], test.failureException)
+            self._record(subtest, "failed" if failed else "error", self._exc_info_to_string(err, test))
+
+    def stopTestRun(self):
+        super().stopTestRun()
+        with open(_output_path, "w", encoding="utf-8") as file:
+            json.dump(self.records, file)
+
+class _RecordingRunner(unittest.TextTestRunner):
+    resultclass = _RecordingResult
+
+def _main(argv: List[str]):
+    global _output_path
+    _output_path = argv[0]
+    # What "python -m unittest" would have on sys.path, rather than this file's directory
+    sys.path[0] = os.getcwd()
+    unittest.main(module=None, argv=["python -m unittest"] + argv[1:], testRunner=_RecordingRunner)
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
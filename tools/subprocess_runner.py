@@ -0,0 +1,206 @@
+import asyncio
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+# Bytes kept from the start and the end of each stream; the middle of anything longer is dropped
+HEAD_BYTES = 32 * 1024
+TAIL_BYTES = 96 * 1024
+# Seconds between progress updates for one process
+PROGRESS_INTERVAL = 2.0
+_CHUNK_SIZE = 64 * 1024
+
+# Called with a one-line status while commands run; None (the default) stays silent
+_progress_handler: Optional[Callable[[str], None]] = None
+
+def set_progress_handler(handler: Optional[Callable[[str], None]]):
+    """Show live progress of running commands through handler, e.g. print. None turns it off."""
+    global _progress_handler
+    _progress_handler = handler
+
+class BoundedOutput:
+    """Keeps the first head_bytes and the last tail_bytes written to it, however much is written.
+
+    The tail is a ring: it grows to twice its size before the oldest half is
+    dropped, so each byte is copied a bounded number of times.
+    """
+
+    def __init__(self, head_bytes: int = HEAD_BYTES, tail_bytes: int = TAIL_BYTES):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data: bytes):
+        self.total += len(data)
+        if len(self.head) < self.head_bytes:
+            room = self.head_bytes - len(self.head)
+            self.head += data[:room]
+            data = data[room:]
+        if not data or not self.tail_bytes:
+            return
+        self.tail += data[-self.tail_bytes:]
+        if len(self.tail) > 2 * self.tail_bytes:
+            del self.tail[:-self.tail_bytes]
+
+    def text(self) -> str:
+        tail = bytes(self.tail[-self.tail_bytes:]) if self.tail_bytes else b""
+        omitted = self.total - len(self.head) - len(tail)
+        head = self.head.decode("utf-8", errors="replace")
+        if omitted <= 0:
+            return head + tail.decode("utf-8", errors="replace")
+        return (f"{head}\n\n[... {omitted} bytes of output omitted ...]\n\n"
+                f"{tail.decode('utf-8', errors='replace')}")
+
+class _Progress:
+    """Reports the latest output line of a command, at most once per PROGRESS_INTERVAL."""
+
+    def __init__(self, cmd: List[str]):
+        self.handler = _progress_handler
+        self.label = " ".join(os.path.basename(part) for part in cmd[:3])
+        self.started = time.monotonic()
+        self.reported = self.started
+        self.partial = b""
+        self.lock = threading.Lock()
+
+    def feed(self, data: bytes):
+        if self.handler is None:
+            return
+        with self.lock:
+            lines = (self.partial + data[-4096:]).split(b"\n")
+            self.partial = lines[-1][-4096:]
+            now = time.monotonic()
+            complete = [line for line in lines[:-1] if line.strip()]
+            if not complete or now - self.reported < PROGRESS_INTERVAL:
+                return
+            self.reported = now
+            line = complete[-1].decode("utf-8", errors="replace").strip()[:160]
+            elapsed = now - self.started
+        self.handler(f"⏳ {self.label} ({elapsed:.0f}s): {line}")
+
+def _kill(process):
+    """Kill the process and everything it started; they share its session."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def run_process(cmd: List[str], timeout: Optional[float] = None, cwd: Optional[str] = None,
+                head_bytes: int = HEAD_BYTES, tail_bytes: int = TAIL_BYTES) -> Tuple[int, str, str]:
+    """Run a command and return (returncode, stdout, stderr), streaming its output as it arrives.
+
+    Like subprocess.run(capture_output=True, text=True), except each stream
+    keeps only its first head_bytes and last tail_bytes, and on timeout the
+    raised subprocess.TimeoutExpired carries the output captured so far.
+    """
+    process = subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd or os.getcwd(),
+        start_new_session=True
+    )
+    progress = _Progress(cmd)
+    outputs = (BoundedOutput(head_bytes, tail_bytes), BoundedOutput(head_bytes, tail_bytes))
+
+    def pump(pipe, output: BoundedOutput):
+        with pipe:
+            while True:
+                data = pipe.read1(_CHUNK_SIZE)
+                if not data:
+                    return
+                output.write(data)
+                progress.feed(data)
+
+    readers = [threading.Thread(target=pump, args=(pipe, output), daemon=True)
+               for pipe, output in zip((process.stdout, process.stderr), outputs)]
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    for reader in readers:
+        reader.start()
+    try:
+        process.wait(timeout)
+        # A child the process left behind may keep the pipes open; the timeout covers it too
+        for reader in readers:
+            reader.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        if any(reader.is_alive() for reader in readers):
+            raise subprocess.TimeoutExpired(cmd, timeout)
+    except subprocess.TimeoutExpired:
+        _kill(process)
+        process.wait()
+        for reader in readers:
+            # Anything that left the process group may still hold the pipes open
+            reader.join(5)
+        raise subprocess.TimeoutExpired(cmd, timeout, outputs[0].text(), outputs[1].text())
+    return process.returncode, outputs[0].text(), outputs[1].text()
+
+async def run_process_async(cmd: List[str], timeout: Optional[float] = None, cwd: Optional[str] = None,
+                            head_bytes: int = HEAD_BYTES, tail_bytes: int = TAIL_BYTES) -> Tuple[int, str, str]:
+    """Run a command on the event loop and return (returncode, stdout, stderr).
+
+    Behaves like run_process: output is streamed into bounded buffers, and
+    on timeout the process is killed and subprocess.TimeoutExpired is raised
+    with the output captured so far.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=cwd or os.getcwd(),
+        start_new_session=True
+    )
+    progress = _Progress(cmd)
+    outputs = (BoundedOutput(head_bytes, tail_bytes), BoundedOutput(head_bytes, tail_bytes))
+
+    async def pump(stream: asyncio.StreamReader, output: BoundedOutput):
+        while True:
+            data = await stream.read(_CHUNK_SIZE)
+            if not data:
+                return
+            output.write(data)
+            progress.feed(data)
+
+    readers = asyncio.gather(pump(process.stdout, outputs[0]), pump(process.stderr, outputs[1]))
+    try:
+        await asyncio.wait_for(asyncio.shield(readers), timeout)
+        await process.wait()
+    except asyncio.TimeoutError:
+        _kill(process)
+        await process.wait()
+        try:
+            # Anything that left the process group may still hold the pipes open
+            await asyncio.wait_for(readers, 5)
+        except asyncio.TimeoutError:
+            pass
+        raise subprocess.TimeoutExpired(cmd, timeout, outputs[0].text(), outputs[1].text())
+
+    return process.returncode, outputs[0].text(), outputs[1].text()
+
+def read_bounded_file(path: str, head_bytes: int = HEAD_BYTES, tail_bytes: int = TAIL_BYTES) -> str:
+    """Read a captured-output file as BoundedOutput would have kept it, without reading the middle."""
+    output = BoundedOutput(head_bytes, tail_bytes)
+    with open(path, "rb") as file:
+        output.write(file.read(head_bytes))
+        skipped = os.fstat(file.fileno()).st_size - head_bytes - tail_bytes
+        if skipped > 0:
+            output.total += skipped
+            file.seek(head_bytes + skipped)
+        output.write(file.read())
+    return output.text()
+
+def timeout_message(message: str, error: subprocess.TimeoutExpired) -> str:
+    """Append the output a timed-out command produced before it was killed to message."""
+    output = [message]
+    if error.stdout:
+        output.append(f"\n📤 Partial STDOUT:\n{error.stdout}")
+    if error.stderr:
+        output.append(f"\n⚠️  Partial STDERR:\n{error.stderr}")
+    return "\n".join(output)
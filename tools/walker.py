@@ -0,0 +1,379 @@
+import os
+import re
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+# Directories no tool wants to look inside
+VCS_DIRS = frozenset({".git", ".hg", ".svn"})
+DEPENDENCY_DIRS = frozenset({"node_modules", ".venv", ".tox", ".nox"})
+CACHE_DIRS = frozenset({"__pycache__", ".mypy_cache", ".pytest_cache", ".ruff_cache"})
+PRUNED_DIRS = VCS_DIRS | DEPENDENCY_DIRS | CACHE_DIRS
+
+IGNORE_FILE_NAMES = (".gitignore", ".ignore")
+
+def translate_glob(pattern: str) -> str:
+    """Translate a gitignore-style glob to a regex body (without anchors).
+
+    * and ? never match '/', [...] classes are supported (with ! or ^ for
+    negation), a backslash escapes the next character, and ** as a whole
+    path segment matches any number of directories: "**/x", "a/**/x" and
+    "a/**" behave as in .gitignore files.
+    """
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            j = i
+            while j < n and pattern[j] == "*":
+                j += 1
+            if j - i >= 2 and (i == 0 or pattern[i - 1] == "/") and (j == n or pattern[j] == "/"):
+                if j == n:
+                    out.append(".+")
+                else:
+                    out.append("(?:.*/)?")
+                    j += 1
+            else:
+                out.append("[^/]*")
+            i = j
+            continue
+        if c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = i + 1
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                negate = body[:1] in ("!", "^")
+                if negate:
+                    body = body[1:]
+                body = body.replace("\\", "\\\\").replace("[", "\\[")
+                out.append(f"[^/{body}]" if negate else f"[{body}]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+# Brace sets multiply; patterns expanding to more alternatives than this are rejected
+_MAX_BRACE_EXPANSIONS = 1024
+
+def expand_braces(pattern: str) -> List[str]:
+    """Expand brace sets: "*.{py,pyi}" -> ["*.py", "*.pyi"]. Sets nest; "{x}" without a comma stays literal."""
+    depth = 0
+    start = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif c == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                options = _split_top_level(pattern[start + 1:i])
+                if len(options) > 1:
+                    expanded = []
+                    for option in options:
+                        expanded.extend(expand_braces(pattern[:start] + option + pattern[i + 1:]))
+                        if len(expanded) > _MAX_BRACE_EXPANSIONS:
+                            raise ValueError(f"Pattern '{pattern}' expands to too many alternatives")
+                    return expanded
+        i += 1
+    return [pattern]
+
+def _split_top_level(text: str) -> List[str]:
+    parts = []
+    depth = 0
+    current = 0
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+        elif c == "," and depth == 0:
+            parts.append(text[current:i])
+            current = i + 1
+        i += 1
+    parts.append(text[current:])
+    return parts
+
+def compile_globs(patterns: Iterable[str]) -> Optional[re.Pattern]:
+    """Compile glob patterns into one regex over "/"-separated relative paths, or None if there are none.
+
+    Patterns without a "/" match the file name at any depth, as "*.py" does;
+    patterns with one match the whole relative path, so "src/**/*.ts" works.
+    """
+    bodies = []
+    for pattern in patterns:
+        for expanded in expand_braces(pattern):
+            body = translate_glob(expanded.lstrip("/"))
+            bodies.append(body if "/" in expanded else "(?:.*/)?" + body)
+    if not bodies:
+        return None
+    return re.compile("|".join(f"(?:{body})" for body in bodies), re.DOTALL)
+
+def glob_matcher(include: Union[str, Iterable[str]] = "*",
+                 exclude: Union[str, Iterable[str], None] = None) -> Callable[[str], bool]:
+    """Return a predicate over relative paths: matches some include pattern and no exclude pattern."""
+    include = [include] if isinstance(include, str) else list(include)
+    exclude = [exclude] if isinstance(exclude, str) else list(exclude or ())
+    include_regex = None if "*" in include or "**" in include else compile_globs(include)
+    exclude_regex = compile_globs(exclude)
+
+    def matches(relative_path: str) -> bool:
+        if os.sep != "/":
+            relative_path = relative_path.replace(os.sep, "/")
+        if include_regex is not None and not include_regex.fullmatch(relative_path):
+            return False
+        return exclude_regex is None or not exclude_regex.fullmatch(relative_path)
+    return matches
+
+class IgnoreRules:
+    """The rules of one ignore file, compiled for matching paths relative to its directory.
+
+    Consecutive rules of the same kind (ignore or "!" re-include) are joined
+    into one regex, and the runs are tried last to first because the last
+    matching rule wins. Directories are matched with a trailing "/" so that
+    directory-only rules ("build/") fold into the same regex.
+    """
+
+    def __init__(self, lines: Iterable[str]):
+        rules: List[Tuple[bool, str]] = []
+        for line in lines:
+            rule = _compile_rule(line)
+            if rule is not None:
+                rules.append(rule)
+
+        self.runs: List[Tuple[bool, re.Pattern]] = []
+        start = 0
+        for end in range(1, len(rules) + 1):
+            if end == len(rules) or rules[end][0] != rules[start][0]:
+                joined = "|".join(f"(?:{body})" for _, body in rules[start:end])
+                self.runs.append((rules[start][0], re.compile(joined, re.DOTALL)))
+                start = end
+        self.runs.reverse()
+
+    def __bool__(self) -> bool:
+        return bool(self.runs)
+
+    def match(self, relative_path: str, is_dir: bool) -> Optional[bool]:
+        """Return True if ignored, False if re-included, or None if no rule matches."""
+        subject = relative_path + "/" if is_dir else relative_path
+        for negated, regex in self.runs:
+            if regex.fullmatch(subject):
+                return not negated
+        return None
+
+def _compile_rule(line: str) -> Optional[Tuple[bool, str]]:
+    """Compile one ignore-file line into (negated, regex body), or None for blanks and comments."""
+    line = line.rstrip("\n\r")
+    # Trailing spaces are dropped unless escaped
+    stripped = line.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped += " "
+    line = stripped
+    if not line or line.startswith("#"):
+        return None
+
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    elif line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    # A slash anywhere but the end anchors the pattern to the ignore file's directory
+    anchored = "/" in line
+    body = translate_glob(line.lstrip("/"))
+    if not anchored:
+        body = "(?:.*/)?" + body
+    return negated, body + ("/" if dir_only else "/?")
+
+_RULES_CACHE: Dict[str, Tuple[int, int, IgnoreRules]] = {}
+_RULES_CACHE_LOCK = threading.Lock()
+
+def load_rules(path: str) -> Optional[IgnoreRules]:
+    """Parse an ignore file, reusing the compiled rules while its mtime and size are unchanged."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    with _RULES_CACHE_LOCK:
+        cached = _RULES_CACHE.get(path)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as file:
+            rules = IgnoreRules(file)
+    except OSError:
+        return None
+    with _RULES_CACHE_LOCK:
+        _RULES_CACHE[path] = (stat.st_mtime_ns, stat.st_size, rules)
+    return rules
+
+# One active rule set: (directory it applies from, prefix of paths below that directory, rules)
+_RuleSet = Tuple[str, str, IgnoreRules]
+
+class IgnoreFilter:
+    """Decides which entries under a directory tree are ignored.
+
+    Entries whose name is in pruned_dirs are always skipped. With
+    use_ignore_files, .gitignore and .ignore files in every directory are
+    honoured, as are those of parent directories up to the enclosing
+    repository root (and its .git/info/exclude), with deeper files taking
+    precedence. Instances can be passed as shutil.copytree's ignore argument.
+    """
+
+    def __init__(self, top: str, use_ignore_files: bool = True, pruned_dirs: Iterable[str] = PRUNED_DIRS):
+        self.top: str = top
+        self.use_ignore_files: bool = use_ignore_files
+        self.pruned_dirs: Set[str] = set(pruned_dirs)
+        self._rules: Dict[str, Tuple[_RuleSet, ...]] = {}
+
+    def root_rules(self) -> Tuple[_RuleSet, ...]:
+        """Rules inherited from parent directories and the repository's info/exclude, outermost first."""
+        if not self.use_ignore_files:
+            return ()
+        absolute_top = os.path.abspath(self.top)
+        # Directories from top up to the repository root; top's own ignore files are read by rules_for
+        ancestors = []
+        directory = absolute_top
+        while not os.path.isdir(os.path.join(directory, ".git")):
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                # Not inside a repository: only the tree's own ignore files apply
+                return ()
+            directory = parent
+            ancestors.append(directory)
+
+        rule_sets = []
+        exclude = load_rules(os.path.join(directory, ".git", "info", "exclude"))
+        if exclude:
+            prefix = os.path.relpath(absolute_top, directory).replace(os.sep, "/") + "/"
+            rule_sets.append((self.top, "" if prefix == "./" else prefix, exclude))
+        for directory in reversed(ancestors):
+            prefix = os.path.relpath(absolute_top, directory).replace(os.sep, "/") + "/"
+            for name in IGNORE_FILE_NAMES:
+                rules = load_rules(os.path.join(directory, name))
+                if rules:
+                    rule_sets.append((self.top, prefix, rules))
+        return tuple(rule_sets)
+
+    def rules_for(self, directory: str, names: Optional[Iterable[str]] = None) -> Tuple[_RuleSet, ...]:
+        """Rules that apply to the entries of directory, which must be top or below it.
+
+        names, when given, are the directory's entries and save probing for ignore files.
+        """
+        cached = self._rules.get(directory)
+        if cached is not None:
+            return cached
+        parent = os.path.dirname(directory)
+        if os.path.join(directory, "") == os.path.join(self.top, "") or parent == directory:
+            inherited = self.root_rules()
+        else:
+            inherited = self.rules_for(parent)
+        own = []
+        if self.use_ignore_files:
+            present = IGNORE_FILE_NAMES if names is None else [n for n in IGNORE_FILE_NAMES if n in names]
+            for name in present:
+                rules = load_rules(os.path.join(directory, name))
+                if rules:
+                    own.append((directory, "", rules))
+        rules = self._rules[directory] = inherited + tuple(own)
+        return rules
+
+    def is_ignored(self, rules: Tuple[_RuleSet, ...], path: str, is_dir: bool) -> bool:
+        """Whether path (a child of the directory rules came from) is ignored."""
+        if is_dir and os.path.basename(path) in self.pruned_dirs:
+            return True
+        for base, prefix, ignore_rules in reversed(rules):
+            relative = path[len(os.path.join(base, "")):]
+            if os.sep != "/":
+                relative = relative.replace(os.sep, "/")
+            verdict = ignore_rules.match(prefix + relative, is_dir)
+            if verdict is not None:
+                return verdict
+        return False
+
+    def __call__(self, directory: str, names: List[str]) -> Set[str]:
+        rules = self.rules_for(directory, names)
+        return {name for name in names
+                if self.is_ignored(rules, os.path.join(directory, name), os.path.isdir(os.path.join(directory, name)))}
+
+def walk(top: str, topdown: bool = True, use_ignore_files: bool = True,
+         pruned_dirs: Iterable[str] = PRUNED_DIRS, max_depth: Optional[int] = None,
+         onerror: Optional[Callable[[OSError], None]] = None
+         ) -> Iterator[Tuple[str, List[os.DirEntry], List[os.DirEntry]]]:
+    """Like os.walk, but yields os.DirEntry lists and skips ignored entries without descending into them.
+
+    The DirEntry objects carry the file type from the directory listing, so
+    callers can check is_dir()/is_file() without extra stat calls. With
+    topdown, removing entries from the yielded dirs list prunes them as with
+    os.walk. Symlinked directories are listed but not followed. max_depth=0
+    lists only top itself.
+    """
+    ignore = IgnoreFilter(top, use_ignore_files, pruned_dirs)
+    yield from _walk(top, ignore, topdown, max_depth, 0, onerror)
+
+def _walk(path: str, ignore: IgnoreFilter, topdown: bool, max_depth: Optional[int], depth: int,
+          onerror: Optional[Callable[[OSError], None]]):
+    try:
+        with os.scandir(path) as iterator:
+            entries = list(iterator)
+    except OSError as e:
+        if onerror is not None:
+            onerror(e)
+        return
+
+    rules = ignore.rules_for(path, {entry.name for entry in entries})
+    dirs, files = [], []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if ignore.is_ignored(rules, entry.path, is_dir):
+            continue
+        (dirs if is_dir else files).append(entry)
+
+    if topdown:
+        yield path, dirs, files
+    if max_depth is None or depth < max_depth:
+        for entry in dirs:
+            try:
+                if entry.is_symlink():
+                    continue
+            except OSError:
+                continue
+            yield from _walk(entry.path, ignore, topdown, max_depth, depth + 1, onerror)
+    if not topdown:
+        yield path, dirs, files
+
+def iter_files(top: str, **kwargs) -> Iterator[os.DirEntry]:
+    """Yield a DirEntry for every file walk() keeps under top."""
+    for _, _, files in walk(top, **kwargs):
+        yield from files
@@ -0,0 +1,268 @@
+"""
+Warm Python workers for run_script.
+
+A worker is a long-lived "zygote" interpreter that has already started up and
+imported a set of modules. Each script runs in a fresh child forked from it,
+so the script gets a clean process (its own globals, cwd, environment and
+argv) without paying interpreter startup or the preloaded imports again.
+
+This file is both the parent-side pool (imported as tools.warm_pool) and the
+zygote itself (run as a script), so it only imports the standard library.
+"""
+
+import atexit
+import io
+import json
+import os
+import runpy
+import select
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import traceback
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Comma-separated modules every worker imports before forking, e.g. "numpy,pandas"
+PRELOAD_ENV = "CODE_AGENT_WARM_MODULES"
+
+def default_preload() -> List[str]:
+    return [name.strip() for name in os.environ.get(PRELOAD_ENV, "").split(",") if name.strip()]
+
+def available() -> bool:
+    return hasattr(os, "fork")
+
+def _read_text(path: str) -> str:
+    with open(path, "rb") as file:
+        return file.read().decode("utf-8", errors="replace")
+
+class WarmWorker:
+    """Parent-side handle on one zygote process and the scripts running under it."""
+
+    def __init__(self, preload: Sequence[str]):
+        self.preload: Tuple[str, ...] = tuple(preload)
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__)] + list(self.preload),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, bufsize=1, start_new_session=True,
+        )
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._pending: Dict[int, Dict] = {}
+        self._ready = threading.Event()
+        self.failed_imports: List[str] = []
+        threading.Thread(target=self._read_responses, name="warm-worker-reader", daemon=True).start()
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, script_path: str, args: List[str], timeout: float, cwd: Optional[str] = None,
+            read_output: Callable[[str], str] = _read_text) -> Tuple[Optional[int], str, str]:
+        """Run a script in a forked child; return (returncode, stdout, stderr), returncode None on timeout.
+
+        read_output turns each captured-output file into text, by default reading all of it.
+        """
+        # The child writes straight to these files, so output survives a kill on timeout
+        paths = []
+        try:
+            for _ in range(2):
+                fd, path = tempfile.mkstemp(prefix="warm-run-", suffix=".out")
+                os.close(fd)
+                paths.append(path)
+            request_id, state = self._submit({
+                "script": script_path,
+                "args": args,
+                "cwd": cwd or os.getcwd(),
+                "env": dict(os.environ),
+                "stdout": paths[0],
+                "stderr": paths[1],
+            })
+            finished = state["done"].wait(timeout)
+            if not finished:
+                pid = state.get("pid")
+                if pid:
+                    try:
+                        # The child leads its own session, so this also reaches anything it started
+                        os.killpg(pid, signal.SIGKILL)
+                    except OSError:
+                        pass
+                state["done"].wait(5)
+            with self._lock:
+                self._pending.pop(request_id, None)
+            if state.get("error"):
+                raise RuntimeError(state["error"])
+
+            stdout, stderr = (read_output(path) for path in paths)
+            return (state.get("returncode") if finished else None), stdout, stderr
+        finally:
+            for path in paths:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    def close(self):
+        if self.alive():
+            self.process.kill()
+            self.process.wait()
+
+    def _submit(self, request: Dict) -> Tuple[int, Dict]:
+        if not self._ready.wait(120) or not self.alive():
+            raise RuntimeError("warm worker failed to start")
+        state = {"done": threading.Event()}
+        with self._lock:
+            request_id = self._next_id
+            self._next_id += 1
+            self._pending[request_id] = state
+            self.process.stdin.write(json.dumps({"id": request_id, **request}) + "\n")
+            self.process.stdin.flush()
+        return request_id, state
+
+    def _read_responses(self):
+        for line in self.process.stdout:
+            message = json.loads(line)
+            if "ready" in message:
+                self.failed_imports = message.get("failed", [])
+                self._ready.set()
+                continue
+            with self._lock:
+                state = self._pending.get(message["id"])
+            if state is None:
+                continue
+            state.update(message)
+            if "returncode" in message or "error" in message:
+                state["done"].set()
+        # The worker died: release everyone waiting on it
+        self._ready.set()
+        with self._lock:
+            for state in self._pending.values():
+                state.setdefault("error", "warm worker exited unexpectedly")
+                state["done"].set()
+
+_workers: Dict[Tuple[str, ...], WarmWorker] = {}
+_workers_lock = threading.Lock()
+
+def get_worker(preload: Optional[Sequence[str]] = None) -> WarmWorker:
+    """Return the running worker for this set of preloaded modules, starting it if needed."""
+    key = tuple(sorted(set(default_preload() if preload is None else preload)))
+    with _workers_lock:
+        worker = _workers.get(key)
+        if worker is None or not worker.alive():
+            worker = _workers[key] = WarmWorker(key)
+        return worker
+
+@atexit.register
+def _close_workers():
+    for worker in list(_workers.values()):
+        worker.close()
+
+# ---- zygote side ----
+
+def _serve(preload: List[str]):
+    # Keep the protocol pipes away from fds 0-2, which children (and stray prints) use
+    requests_fd = os.dup(0)
+    responses = os.fdopen(os.dup(1), "w", buffering=1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    sys.path[0] = os.getcwd()
+
+    failed = []
+    for name in preload:
+        try:
+            __import__(name)
+        except Exception:
+            failed.append(name)
+    responses.write(json.dumps({"ready": True, "failed": failed}) + "\n")
+
+    children: Dict[int, int] = {}
+    buffer = b""
+    while True:
+        readable, _, _ = select.select([requests_fd], [], [], 0.02 if children else None)
+        if readable:
+            data = os.read(requests_fd, 65536)
+            if not data:
+                break
+            buffer += data
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                request = json.loads(line)
+                responses.flush()
+                pid = os.fork()
+                if pid == 0:
+                    os.close(requests_fd)
+                    responses.close()
+                    _run_child(request)
+                children[pid] = request["id"]
+                responses.write(json.dumps({"id": request["id"], "pid": pid}) + "\n")
+
+        while children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            request_id = children.pop(pid, None)
+            if request_id is not None:
+                responses.write(json.dumps({"id": request_id, "returncode": os.waitstatus_to_exitcode(status)}) + "\n")
+
+def _run_child(request: Dict):
+    """Become the script: set up stdio, cwd, environment and argv, run it as __main__ and exit."""
+    code = 1
+    try:
+        os.setsid()
+        stdin = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(stdin, 0)
+        os.dup2(os.open(request["stdout"], os.O_WRONLY), 1)
+        os.dup2(os.open(request["stderr"], os.O_WRONLY), 2)
+        sys.stdin = open(0, "r", closefd=False)
+        if request["env"].get("PYTHONUNBUFFERED"):
+            # As python -u would, so a child killed on timeout still leaves all its output behind
+            sys.stdout = io.TextIOWrapper(open(1, "wb", buffering=0, closefd=False), write_through=True)
+            sys.stderr = io.TextIOWrapper(open(2, "wb", buffering=0, closefd=False), write_through=True)
+        else:
+            sys.stdout = open(1, "w", closefd=False)
+            # Line-buffered, as a fresh interpreter's stderr is
+            sys.stderr = open(2, "w", buffering=1, closefd=False)
+
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        script = request["script"]
+        sys.argv = [script] + request["args"]
+        sys.path[0] = os.path.dirname(os.path.abspath(script))
+
+        try:
+            runpy.run_path(script, run_name="__main__")
+            code = 0
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+            elif isinstance(e.code, int):
+                code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                code = 1
+        except BaseException as e:
+            # Drop the worker and runpy frames so the traceback reads as if python ran the script
+            tb = e.__traceback__
+            while tb is not None and tb.tb_frame.f_code.co_filename != script:
+                tb = tb.tb_next
+            traceback.print_exception(type(e), e, tb or e.__traceback__)
+            code = 1
+
+        # What a normal interpreter exit would do: wait for threads, run atexit hooks
+        for thread in threading.enumerate():
+            if thread is not threading.main_thread() and not thread.daemon:
+                thread.join()
+        atexit._run_exitfuncs()
+    finally:
+        # Output reaches the files before the parent hears the child exited
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        os._exit(code)
+
+if __name__ == "__main__":
+    _serve(sys.argv[1:])